@@ -0,0 +1,87 @@
+"""End-to-end crawl throughput against the local mock MAL server.
+
+Usage:
+    python benchmarks/bench_crawl.py [--list-pages 4] [--concurrency 1 2 4 8] [--rate 20]
+        [--latency-ms 150] [--error-rate 0.02] [--burst-every 200] [--burst-length 20]
+
+For each concurrency level, runs web_scrapper.main with the HTTP backend
+in a fresh temporary directory against benchmarks/mock_mal_server.py and
+reports pages/minute, how many records were saved, and what the server
+answered (so retries, 429 backoff and errors show up next to throughput).
+The crawler's own output is suppressed; the stage metrics of each run are
+printed with --verbose.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import metrics
+from mock_mal_server import PAGE_SIZE, MockMAL, serve
+from rate_limiter import RateLimiter
+from web_scrapper import main as crawl_main
+
+
+def run_crawl(base_url, list_pages, concurrency, rate):
+    """Crawl list_pages list pages from scratch; returns (seconds, records saved, crawler output)."""
+    metrics.METRICS = metrics.Metrics()
+    output = io.StringIO()
+    with tempfile.TemporaryDirectory() as directory:
+        cwd = os.getcwd()
+        os.chdir(directory)
+        try:
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(output):
+                crawl_main(num_iterations=list_pages, backend="http", base_url=base_url, concurrency=concurrency,
+                           rate_limiter=RateLimiter(rate=rate, max_rate=rate * 2))
+            elapsed = time.perf_counter() - start
+            with open('manga_data_new.json', mode='r', encoding='utf-8') as file:
+                saved = len(json.load(file))
+        finally:
+            os.chdir(cwd)
+    return elapsed, saved, output.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--list-pages', type=int, default=4, help=f'list pages to crawl ({PAGE_SIZE} manga each)')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--rate', type=float, default=20.0, help='starting requests/second of the rate limiter')
+    parser.add_argument('--latency-ms', type=float, default=150.0)
+    parser.add_argument('--latency-jitter-ms', type=float, default=50.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--burst-every', type=int, default=0)
+    parser.add_argument('--burst-length', type=int, default=0)
+    parser.add_argument('--retry-after', type=int, default=1)
+    parser.add_argument('--verbose', action='store_true', help="print each run's stage metrics")
+    args = parser.parse_args()
+
+    manga = args.list_pages * PAGE_SIZE
+    base_url = f"http://127.0.0.1:{args.port}/topmanga.php?limit="
+    print(f"{manga} manga, latency {args.latency_ms:.0f}±{args.latency_jitter_ms:.0f} ms, "
+          f"error rate {args.error_rate:.0%}, 429 bursts of {args.burst_length} every {args.burst_every} requests")
+    for concurrency in args.concurrency:
+        mock = MockMAL(manga, args.latency_ms, args.latency_jitter_ms, args.error_rate,
+                       args.burst_every, args.burst_length, args.retry_after, seed=concurrency)
+        server = serve(mock, port=args.port)
+        try:
+            elapsed, saved, output = run_crawl(base_url, args.list_pages, concurrency, args.rate)
+        finally:
+            server.shutdown()
+            server.server_close()
+        pages = mock.statuses[200]
+        print(f"  concurrency {concurrency:2}: {elapsed:7.1f}s  {pages / elapsed * 60:8.1f} pages/min  "
+              f"{saved}/{manga} saved  responses {dict(sorted(mock.statuses.items()))}")
+        if args.verbose:
+            print(output[output.rfind(' pages in '):].partition('\n')[2])
+
+
+if __name__ == '__main__':
+    main()
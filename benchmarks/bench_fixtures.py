@@ -0,0 +1,131 @@
+"""Offline parser benchmark and regression check over the frozen fixture corpus.
+
+Usage:
+    python benchmarks/bench_fixtures.py [--repeat N] [--update]
+
+Parses every page under benchmarks/fixtures/ with the crawler's own parsing
+code (parse_manga_page for detail pages; parse_top_manga_links and
+parse_ranking_rows for topmanga.php pages) and reports pages/second, the
+tracemalloc peak of one pass, and field-level differences against
+benchmarks/fixtures/golden.json. Exits with status 1 if any output differs.
+--update rewrites the golden records from the current parser output instead.
+
+Detail pages are named <MAL id>_<slug>.html. The corpus is synthetic: pages
+reproduce the structure of MAL's markup (sidebar blocks, stats header,
+review summary, ranking rows, plus menus and comment filler) with made-up
+numbers, covering a regular manga, a one-shot, a light novel, a manhwa, an
+unscored entry without a review summary and singular "Genre:"/"Theme:"
+labels. Add real saved pages the same way to widen it.
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage import LEGACY_TITLE
+from web_scrapper import parse_manga_page, parse_ranking_rows, parse_top_manga_links
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+GOLDEN_PATH = os.path.join(FIXTURES_DIR, 'golden.json')
+
+
+def detail_url(file_name):
+    mal_id, _, slug = os.path.splitext(file_name)[0].partition('_')
+    return f"https://myanimelist.net/manga/{mal_id}/{slug}"
+
+
+def load_fixtures(kind):
+    """Return (file name, html) pairs for the 'detail' or 'list' pages."""
+    pages = []
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, kind, '*.html'))):
+        with open(path, mode='r', encoding='utf-8') as file:
+            pages.append((os.path.basename(path), file.read()))
+    return pages
+
+
+def parse_detail(name, html):
+    record = parse_manga_page(html, detail_url(name))
+    del record['Last Fetched']  # Depends on when the benchmark runs
+    record.pop(LEGACY_TITLE, None)  # Lookup-only, never stored
+    return record
+
+
+def parse_list(name, html):
+    return {'links': parse_top_manga_links(html), 'rows': parse_ranking_rows(html)}
+
+
+PARSERS = {'detail': parse_detail, 'list': parse_list}
+
+
+def pages_per_second(parse, pages, repeat):
+    """Best-of-repeat throughput over pages."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for name, html in pages:
+            parse(name, html)
+        best = min(best, time.perf_counter() - start)
+    return len(pages) / best
+
+
+def peak_memory(parse, pages):
+    """Peak traced allocation, in bytes, while parsing pages once."""
+    tracemalloc.start()
+    try:
+        for name, html in pages:
+            parse(name, html)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def diff(expected, actual, path=''):
+    """Yield 'path: expected -> actual' lines for every differing field."""
+    if isinstance(expected, dict) and isinstance(actual, dict):
+        for key in list(expected) + [key for key in actual if key not in expected]:
+            yield from diff(expected.get(key), actual.get(key), f"{path}.{key}" if path else str(key))
+    elif isinstance(expected, list) and isinstance(actual, list) and len(expected) == len(actual) \
+            and all(isinstance(item, dict) for item in expected + actual):
+        for i, (old, new) in enumerate(zip(expected, actual)):
+            yield from diff(old, new, f"{path}[{i}]")
+    elif expected != actual:
+        yield f"{path}: {expected!r} -> {actual!r}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--update', action='store_true', help='rewrite golden.json from the current output')
+    args = parser.parse_args()
+
+    fixtures = {kind: load_fixtures(kind) for kind in PARSERS}
+    outputs = {kind: {name: PARSERS[kind](name, html) for name, html in pages} for kind, pages in fixtures.items()}
+    if args.update:
+        with open(GOLDEN_PATH, mode='w', encoding='utf-8') as file:
+            json.dump(outputs, file, ensure_ascii=False, indent=4)
+            file.write('\n')
+        print(f"Golden records written to {GOLDEN_PATH}")
+        return
+
+    for kind, pages in fixtures.items():
+        rate = pages_per_second(PARSERS[kind], pages, args.repeat)
+        peak = peak_memory(PARSERS[kind], pages)
+        print(f"{kind:6} {len(pages):3} pages  {rate:8.1f} pages/s  peak {peak / 1024:8.1f} KiB")
+
+    with open(GOLDEN_PATH, mode='r', encoding='utf-8') as file:
+        golden = json.load(file)
+    differences = list(diff(golden, outputs))
+    for line in differences:
+        print(f"  {line}")
+    print(f"{len(differences)} differences from golden records")
+    if differences:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""Compare Chrome page loads with the lean browsing profile against the
+normal profile: load time and bytes transferred per page.
+
+Usage:
+    python benchmarks/bench_page_load.py URL [URL ...] [--repeat N] [--show-browser]
+
+Point the URLs at a local mirror of MAL detail pages (e.g. pages saved with
+their images, stylesheets and scripts, served by `python -m http.server`)
+rather than at myanimelist.net. Load time runs until the extractor's anchor
+is present, which is what the crawler waits for. Bytes are the encoded
+sizes of every response over the whole load: the page is left to reach
+document.readyState "complete" and the network to go quiet, and the
+encodedDataLength of each DevTools Network.loadingFinished event is added
+up. That covers cross-origin responses too, and blocked requests count as
+zero.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+from web_scrapper import DETAIL_READY_SELECTOR, initialize_driver
+
+# The page load is over once no response finished for this long
+NETWORK_QUIET_SECONDS = 1.0
+
+
+def network_events(driver):
+    """Drain the DevTools events recorded since the last call."""
+    for entry in driver.get_log('performance'):
+        message = json.loads(entry['message'])['message']
+        if message['method'].startswith('Network.'):
+            yield message
+
+
+def load_page(driver, url):
+    """Load url, timing until the extractor's anchor is present; returns (seconds, requests, bytes)."""
+    list(network_events(driver))  # Drop events of the previous page
+    start = time.perf_counter()
+    driver.get(url)
+    WebDriverWait(driver, 30).until(EC.presence_of_element_located((By.CSS_SELECTOR, DETAIL_READY_SELECTOR)))
+    elapsed = time.perf_counter() - start
+
+    # Keep counting while images, scripts and ads the profile allows finish loading
+    WebDriverWait(driver, 60).until(lambda d: d.execute_script("return document.readyState") == "complete")
+    requests, transferred = 0, 0
+    quiet_since = time.perf_counter()
+    while time.perf_counter() - quiet_since < NETWORK_QUIET_SECONDS:
+        time.sleep(0.1)
+        for event in network_events(driver):
+            if event['method'] == 'Network.requestWillBeSent':
+                requests += 1
+            elif event['method'] == 'Network.loadingFinished':
+                transferred += event['params']['encodedDataLength']
+                quiet_since = time.perf_counter()
+    return elapsed, requests, transferred
+
+
+def measure(lean, urls, repeat, headless):
+    driver = initialize_driver(headless, lean=lean, performance_log=True)
+    try:
+        samples = [load_page(driver, url) for _ in range(repeat) for url in urls]
+    finally:
+        driver.quit()
+    count = len(samples)
+    return tuple(sum(sample[i] for sample in samples) / count for i in range(3))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('urls', nargs='+')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--show-browser', action='store_true')
+    args = parser.parse_args()
+
+    print(f"{len(args.urls)} pages x {args.repeat}")
+    results = {}
+    for label, lean in (("normal profile", False), ("lean profile", True)):
+        results[label] = measure(lean, args.urls, args.repeat, not args.show_browser)
+        seconds, requests, transferred = results[label]
+        print(f"  {label:15} {seconds * 1000:8.0f} ms/page  {requests:6.1f} requests/page  "
+              f"{transferred / 1024:8.1f} KiB/page")
+    normal, lean = results["normal profile"], results["lean profile"]
+    print(f"  lean saves {1 - lean[0] / normal[0]:.0%} of load time and "
+          f"{1 - lean[2] / max(normal[2], 1):.0%} of bytes")
+
+
+if __name__ == '__main__':
+    main()
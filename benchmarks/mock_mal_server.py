@@ -0,0 +1,169 @@
+"""Local stand-in for myanimelist.net, for end-to-end crawl benchmarks without network.
+
+Usage:
+    python benchmarks/mock_mal_server.py [--port 8765] [--manga 1000] [--latency-ms 150]
+        [--latency-jitter-ms 50] [--error-rate 0.01] [--burst-every 200] [--burst-length 20]
+
+Serves /topmanga.php?limit=N (50 ranking rows per page, the last page cut
+at --manga) and /manga/<id>[/<slug>] detail pages. A detail page is the
+fixture with that MAL id if benchmarks/fixtures/detail has one; otherwise a
+fixture is reused with its title suffixed by the id, so every manga is
+distinct. Responses are delayed by a normally distributed latency, a
+fraction --error-rate of them fail with HTTP 500, and after every
+--burst-every requests the next --burst-length are refused with HTTP 429
+and a Retry-After header, like a rate limiter kicking in. Point the crawler
+at it with main(backend="http", base_url="http://127.0.0.1:8765/topmanga.php?limit=").
+"""
+import argparse
+import glob
+import os
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'detail')
+MANGA_PATH = re.compile(r'^/manga/(\d+)(?:/.*)?$')
+PAGE_SIZE = 50
+
+LIST_PAGE = """<!DOCTYPE html><html><head><title>Top Manga - MyAnimeList.net</title></head><body class="page-common">
+<div id="content"><table class="top-ranking-table"><tr class="table-header"><td class="rank">Rank</td><td class="title">Title</td><td class="score">Score</td></tr>
+{rows}
+</table><div class="pagination"><a class="link-blue-box next" href="?limit={next_limit}">Next 50</a></div></div></body></html>
+"""
+LIST_ROW = """<tr class="ranking-list"><td class="rank ac" valign="top"><span class="lightLink top-anime-rank-text rank{rank}">{rank}</span></td><td class="title al va-t clearfix word-break"><a class="hoverinfo_trigger fl-l ml12 mr8" href="{url}" id="#area{id}" rel="#info{id}"><img width="50" height="70" alt="Manga: {title}" class="lazyload" data-src="/images/manga/{id}.jpg"></a><div class="detail"><div class="di-ib clearfix"><h3 class="manga_h3"><a href="{url}" class="hoverinfo_trigger">{title}</a></h3></div><div class="information di-ib mt4">Manga (? vols)<br>Jan 2000 - <br>{members:,} members</div></div></td><td class="score ac fs14"><div class="js-top-ranking-score-col di-ib al"><span class="text on score-label score-9">{score:.2f}</span></div></td></tr>"""
+
+
+class MockMAL:
+    """Page generation and fault injection, shared by every request handler thread."""
+
+    def __init__(self, manga=1000, latency_ms=150.0, latency_jitter_ms=50.0, error_rate=0.0,
+                 burst_every=0, burst_length=0, retry_after=2, seed=None):
+        self.manga = manga
+        self.latency_ms = latency_ms
+        self.latency_jitter_ms = latency_jitter_ms
+        self.error_rate = error_rate
+        self.burst_every = burst_every
+        self.burst_length = burst_length
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.statuses = Counter()
+        self.fixtures = {}
+        for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, '*.html'))):
+            mal_id = int(os.path.basename(path).partition('_')[0])
+            with open(path, mode='r', encoding='utf-8') as file:
+                self.fixtures[mal_id] = file.read()
+        self.templates = list(self.fixtures.values())
+
+    def fault(self):
+        """Return the error status to answer with (and the latency to add), or None."""
+        with self.lock:
+            self.requests += 1
+            number = self.requests
+            delay = max(0.0, self.random.gauss(self.latency_ms, self.latency_jitter_ms)) / 1000
+            failed = self.random.random() < self.error_rate
+        if self.burst_every and number % (self.burst_every + self.burst_length) >= self.burst_every:
+            return 429, delay
+        return (500 if failed else None), delay
+
+    def count(self, status):
+        with self.lock:
+            self.statuses[status] += 1
+
+    def list_page(self, host, limit):
+        rows = []
+        for rank in range(limit + 1, min(limit + PAGE_SIZE, self.manga) + 1):
+            mal_id = rank  # Synthetic ids follow the ranking
+            rows.append(LIST_ROW.format(
+                rank=rank, id=mal_id, title=f"Mock Manga {mal_id}", url=f"http://{host}/manga/{mal_id}/Mock_Manga_{mal_id}",
+                members=max(1, 1_000_000 // rank), score=max(1.0, 9.5 - rank / 1000),
+            ))
+        return LIST_PAGE.format(rows="\n".join(rows), next_limit=limit + PAGE_SIZE)
+
+    def detail_page(self, mal_id):
+        if mal_id in self.fixtures:
+            return self.fixtures[mal_id]
+        if not 0 < mal_id <= self.manga:
+            return None
+        template = self.templates[mal_id % len(self.templates)]
+        return re.sub(r'(<span itemprop="name">)([^<]*)', rf'\g<1>\g<2> (mock {mal_id})', template, count=1)
+
+
+class Handler(BaseHTTPRequestHandler):
+    server_version = "MockMAL/1.0"
+
+    def log_message(self, format, *args):
+        pass  # One line per request would drown the crawler's output
+
+    def send(self, status, body=b'', headers=()):
+        self.server.mock.count(status)
+        self.send_response(status)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        mock = self.server.mock
+        status, delay = mock.fault()
+        time.sleep(delay)
+        if status == 429:
+            return self.send(429, b'Too Many Requests', [("Retry-After", str(mock.retry_after))])
+        if status:
+            return self.send(status, b'Internal Server Error')
+
+        parts = urlsplit(self.path)
+        if parts.path == '/topmanga.php':
+            limit = int(parse_qs(parts.query).get('limit', ['0'])[0] or 0)
+            return self.send(200, mock.list_page(self.headers.get('Host', 'localhost'), limit).encode('utf-8'))
+        match = MANGA_PATH.match(parts.path)
+        html = mock.detail_page(int(match.group(1))) if match else None
+        if html is None:
+            return self.send(404, b'Not Found')
+        self.send(200, html.encode('utf-8'))
+
+
+def serve(mock, host='127.0.0.1', port=8765):
+    """Start the server in a daemon thread; returns the ThreadingHTTPServer (call shutdown() to stop)."""
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    server.mock = mock
+    threading.Thread(target=server.serve_forever, name='mock-mal', daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--manga', type=int, default=1000, help='number of ranked manga')
+    parser.add_argument('--latency-ms', type=float, default=150.0)
+    parser.add_argument('--latency-jitter-ms', type=float, default=50.0)
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests answered with HTTP 500')
+    parser.add_argument('--burst-every', type=int, default=0, help='requests between 429 bursts (0: never)')
+    parser.add_argument('--burst-length', type=int, default=0, help='requests refused with 429 per burst')
+    parser.add_argument('--retry-after', type=int, default=2)
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+
+    mock = MockMAL(args.manga, args.latency_ms, args.latency_jitter_ms, args.error_rate,
+                   args.burst_every, args.burst_length, args.retry_after, args.seed)
+    server = serve(mock, args.host, args.port)
+    print(f"Mock MAL serving {args.manga} manga on http://{args.host}:{args.port}/topmanga.php?limit=0")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+        print(f"{mock.requests} requests: {dict(mock.statuses)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,203 @@
+import time
+from collections import defaultdict
+
+import trio
+
+import metrics
+
+
+def print_error(url, error):
+    print(f"Error processing {url}: {error}")
+
+
+class QueueDepths:
+    """Periodic samples of how many items wait in front of each pipeline stage.
+
+    A queue that stays full means the stage it feeds is the bottleneck; one
+    that stays empty means that stage is starved by the one before it.
+    """
+
+    def __init__(self, interval=1.0):
+        self.interval = interval
+        self.samples = defaultdict(list)
+
+    async def watch(self, channels):
+        while True:
+            for stage, channel in channels.items():
+                self.samples[stage].append(channel.statistics().current_buffer_used)
+            await trio.sleep(self.interval)
+
+    def summary(self):
+        lines = []
+        for stage, samples in self.samples.items():
+            mean = sum(samples) / len(samples)
+            lines.append(f"{stage}: mean queue depth {mean:.1f}, max {max(samples)}")
+        return "\n".join(lines)
+
+
+def _parse_in_process(parse, html, url):
+    # Runs in a pool process: hand back the timings parse recorded there
+    # (parse, extract, field:*) along with the record
+    result = parse(html, url)
+    return result, metrics.METRICS.take()
+
+
+def _run_parse(parse, html, url, pool):
+    # Blocks a worker thread until the parse finished (in a process, given a pool)
+    if pool is None:
+        return parse(html, url)
+    result, (histograms, counters) = pool.submit(_parse_in_process, parse, html, url).result()
+    metrics.METRICS.merge(histograms, counters)
+    return result
+
+
+async def _fetch_worker(urls, fetch, fetched, on_error, before_fetch):
+    """Fetch URLs from the channel and pass their HTML on to the parse stage."""
+    async with urls, fetched:
+        async for url in urls:
+            if before_fetch is not None and before_fetch(url) is False:
+                continue
+            try:
+                # fetch is blocking, so run it off the event loop
+                start = time.perf_counter()
+                html = await trio.to_thread.run_sync(fetch, url)
+                metrics.observe('stage:fetch', time.perf_counter() - start)
+            except Exception as e:
+                on_error(url, e)
+                continue
+            await fetched.send((url, html))
+
+
+async def _parse_worker(fetched, parse, pool, parsed, on_error):
+    """Parse fetched pages and pass the records on to the write stage."""
+    async with fetched, parsed:
+        async for url, html in fetched:
+            try:
+                start = time.perf_counter()
+                result = await trio.to_thread.run_sync(_run_parse, parse, html, url, pool)
+                metrics.observe('stage:parse', time.perf_counter() - start)
+            except Exception as e:
+                on_error(url, e)
+                continue
+            await parsed.send((url, result))
+
+
+async def _write_worker(parsed, write, write_batch, on_result, on_error):
+    """Persist parsed records in batches of whatever is waiting, then report them."""
+    async with parsed:
+        async for first in parsed:
+            batch = [first]
+            while len(batch) < write_batch:
+                try:
+                    batch.append(parsed.receive_nowait())
+                except (trio.WouldBlock, trio.EndOfChannel):
+                    break
+            if write is not None:
+                try:
+                    start = time.perf_counter()
+                    await trio.to_thread.run_sync(write, batch)
+                    metrics.observe('stage:write', time.perf_counter() - start)
+                except Exception as e:
+                    for url, _ in batch:
+                        on_error(url, e)
+                    continue
+            for url, result in batch:
+                on_result(url, result)
+
+
+async def _list_worker(list_urls, fetch, parse_links, on_links, detail_urls, on_error, before_fetch):
+    """Fetch list pages from the channel and stream their links into detail_urls."""
+    async with list_urls, detail_urls:
+        async for list_url in list_urls:
+            if before_fetch is not None and before_fetch(list_url) is False:
+                continue
+            try:
+                html = await trio.to_thread.run_sync(fetch, list_url)
+                links = await trio.to_thread.run_sync(parse_links, html)
+            except Exception as e:
+                on_error(list_url, e)
+                continue
+            for url in on_links(list_url, links):
+                await detail_urls.send(url)
+
+
+async def _send_all(channel, items):
+    async with channel:
+        for item in items:
+            await channel.send(item)
+
+
+async def crawl(list_urls, fetch_list, parse_links, on_links, detail_urls, fetch, parse, on_result,
+                max_in_flight=4, list_in_flight=2, on_error=print_error,
+                parse_pool=None, parse_workers=None, write=None, write_batch=50, queue_depths=None,
+                before_fetch=None):
+    """Enumerate list pages and crawl the detail pages they link to, concurrently.
+
+    Up to list_in_flight list pages are fetched at once; as soon as one lands,
+    parse_links(html) extracts its links and on_links(list_url, links) returns
+    the ones to crawl, which go straight to the detail workers, so detail
+    fetching starts without waiting for the rest of the list. detail_urls are
+    crawled too (e.g. left over from an interrupted run).
+
+    Detail pages then flow through three stages joined by bounded queues, so
+    each runs while the others work and a slow stage holds back the ones
+    before it instead of letting work pile up in memory:
+
+    - fetch: up to max_in_flight fetch(url) calls at once;
+    - parse: parse_workers parse(html, url) calls at once (max_in_flight by
+      default), in worker processes when parse_pool (a
+      concurrent.futures.ProcessPoolExecutor) is given, so parsing uses every
+      core; parse must then be picklable;
+    - write: a single writer takes up to write_batch parsed (url, record)
+      pairs at a time and passes them to write(batch) in a worker thread,
+      then calls on_result(url, record) for each.
+
+    fetch_list, parse_links and fetch run in worker threads. Politeness is
+    left to the fetchers: they share one per-host RateLimiter, so the
+    request budget is global across both fetching stages. on_links,
+    on_result and on_error(url, exc) run on the event loop, one at a time,
+    so they need no locking; so does before_fetch(url), called for each list
+    and detail URL as a worker takes it off its queue, right before fetching
+    it (returning False skips the URL). With queue_depths (a QueueDepths), the queue in
+    front of each stage is sampled while the crawl runs.
+    """
+    parse_workers = parse_workers or max_in_flight
+    send_list, receive_list = trio.open_memory_channel(0)
+    send_detail, receive_detail = trio.open_memory_channel(max_in_flight)
+    send_fetched, receive_fetched = trio.open_memory_channel(parse_workers)
+    send_parsed, receive_parsed = trio.open_memory_channel(write_batch)
+
+    async with trio.open_nursery() as monitor:
+        if queue_depths is not None:
+            monitor.start_soon(queue_depths.watch, {
+                'fetch': receive_detail, 'parse': receive_fetched, 'write': receive_parsed,
+            })
+        async with trio.open_nursery() as nursery:
+            nursery.start_soon(_write_worker, receive_parsed, write, write_batch, on_result, on_error)
+            async with receive_fetched, send_parsed:
+                for _ in range(parse_workers):
+                    nursery.start_soon(_parse_worker, receive_fetched.clone(), parse, parse_pool,
+                                       send_parsed.clone(), on_error)
+            async with receive_detail, send_fetched:
+                for _ in range(max_in_flight):
+                    nursery.start_soon(_fetch_worker, receive_detail.clone(), fetch, send_fetched.clone(), on_error,
+                                       before_fetch)
+            async with send_detail, receive_list:
+                nursery.start_soon(_send_all, send_detail.clone(), detail_urls)
+                for _ in range(list_in_flight):
+                    nursery.start_soon(_list_worker, receive_list.clone(), fetch_list, parse_links, on_links,
+                                       send_detail.clone(), on_error, before_fetch)
+            await _send_all(send_list, list_urls)
+        monitor.cancel_scope.cancel()
+
+
+async def crawl_detail_pages(urls, fetch, parse, on_result, max_in_flight=4, on_error=print_error, **pipeline_options):
+    """Fetch and parse detail pages with at most max_in_flight requests in flight.
+
+    The detail-only form of crawl(): fetch(url) returns HTML and parse(html,
+    url) returns a record; on_result(url, record) and on_error(url, exc) run
+    on the event loop. pipeline_options (parse_pool, parse_workers, write,
+    write_batch, queue_depths, before_fetch) are passed on to crawl().
+    """
+    await crawl((), None, None, None, urls, fetch, parse, on_result,
+                max_in_flight=max_in_flight, list_in_flight=0, on_error=on_error, **pipeline_options)
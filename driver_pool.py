@@ -0,0 +1,97 @@
+import queue
+import threading
+from contextlib import contextmanager
+
+from selenium.common.exceptions import WebDriverException
+
+
+class DriverPool:
+    """A fixed number of long-lived WebDriver sessions, leased to worker threads.
+
+    Starting Chrome costs seconds, so sessions are created lazily (at most
+    size of them) and reused across pages. A session is health-checked
+    before each lease and after a failed page, and replaced when it no longer
+    answers (crashed browser, dead chromedriver). After max_pages pages a
+    session is quit and replaced anyway, which caps Chrome's memory growth
+    over a long crawl. Thread-safe.
+    """
+
+    def __init__(self, create_driver, size=4, max_pages=200):
+        self.create_driver = create_driver
+        self.size = size
+        self.max_pages = max_pages
+        self.slots = threading.BoundedSemaphore(size)
+        self.idle = queue.LifoQueue()  # Most recently used first, its caches are warm
+        self.lock = threading.Lock()
+        self.pages = {}  # driver -> pages loaded
+        self.closed = False
+
+    @staticmethod
+    def is_healthy(driver):
+        try:
+            driver.current_url  # A round trip to the browser
+            return True
+        except WebDriverException:
+            return False
+
+    def _checkout(self):
+        while True:
+            try:
+                driver = self.idle.get_nowait()
+            except queue.Empty:
+                break
+            if self.is_healthy(driver):
+                return driver
+            print("Replacing a WebDriver session that stopped responding")
+            self._discard(driver)
+        driver = self.create_driver()
+        with self.lock:
+            self.pages[driver] = 0
+        return driver
+
+    def _discard(self, driver):
+        with self.lock:
+            self.pages.pop(driver, None)
+        try:
+            driver.quit()
+        except WebDriverException:
+            pass  # Already gone
+
+    @contextmanager
+    def lease(self):
+        """Borrow a session for one page; blocks while all size sessions are busy."""
+        if self.closed:
+            raise RuntimeError("DriverPool is closed")
+        self.slots.acquire()
+        try:
+            driver = self._checkout()
+            try:
+                yield driver
+            except WebDriverException:
+                if not self.is_healthy(driver):
+                    self._discard(driver)
+                    driver = None
+                raise
+            finally:
+                if driver is not None:
+                    self._release(driver)
+        finally:
+            self.slots.release()
+
+    def _release(self, driver):
+        with self.lock:
+            self.pages[driver] += 1
+            worn_out = self.pages[driver] >= self.max_pages
+        if worn_out or self.closed:
+            self._discard(driver)
+        else:
+            self.idle.put(driver)
+
+    def close(self):
+        """Quit every idle session; leased ones are quit when returned."""
+        self.closed = True
+        while True:
+            try:
+                self._discard(self.idle.get_nowait())
+            except queue.Empty:
+                return
@@ -0,0 +1,293 @@
+import re
+import time
+from urllib.parse import urlsplit
+
+from bs4 import BeautifulSoup, SoupStrainer, Tag
+
+import metrics
+
+try:
+    import lxml  # noqa: F401  Optional, much faster tree builder
+    PARSER = 'lxml'
+except ImportError:
+    PARSER = 'html.parser'
+
+
+# Not a stored field: the whole span[itemprop=name] text, main title and the
+# English title nested in it run together, which is what scraper versions
+# before the Title fix saved as the Title. with_defaults keeps it so storage
+# can still find those records (see storage.LEGACY_TITLE).
+FULL_TITLE = 'Full Title'
+
+MANGA_PATH = re.compile(r'^/manga/(\d+)(?:/.*)?$')
+
+
+def parse_manga_id(url):
+    """Return the numeric MAL id of a /manga/<id>/<slug> URL, or None."""
+    match = MANGA_PATH.match(urlsplit(url).path)
+    return int(match.group(1)) if match else None
+
+
+def _text(tag):
+    return tag.text.strip()
+
+
+def _title(header):
+    """The main title: the first text of span[itemprop=name], not the English title nested after it."""
+    name = header.find('span', itemprop='name') or header
+    first = next((node.strip() for node in name.contents if isinstance(node, str) and node.strip()), None)
+    return first or _text(name)
+
+
+def _strong_text(tag):
+    strong = tag.find('strong')
+    return strong.text.strip() if strong else None
+
+
+def _link_texts(container):
+    return [a.text.strip() for a in container.find_all('a')]
+
+
+def _first_link_text(container):
+    a = container.find('a')
+    return a.text.strip() if a else None
+
+
+def _text_after_label(container):
+    """Text that follows the dark_text label, e.g. '12,345' in 'Favorites: 12,345'."""
+    label = container.find('span', class_='dark_text')
+    return label.next_sibling.strip() if label and isinstance(label.next_sibling, str) else None
+
+
+# Sidebar blocks look like <div class="spaceit_pad"><span class="dark_text">Label:</span> ...</div>.
+# Singular and plural labels (Theme/Themes) map to the same field.
+SIDEBAR_FIELDS = {
+    'Type': ('Type', _first_link_text),
+    'Genre': ('Genres', _link_texts),
+    'Genres': ('Genres', _link_texts),
+    'Theme': ('Themes', _link_texts),
+    'Themes': ('Themes', _link_texts),
+    'Demographic': ('Demographic', _first_link_text),
+    'Demographics': ('Demographic', _first_link_text),
+    'Favorites': ('Favourites', _text_after_label),
+}
+
+# Other anchors, keyed on (tag name, CSS class).
+CLASS_FIELDS = {
+    ('div', 'score-label'): ('Score', _text),
+    ('span', 'ranked'): ('Rank', _strong_text),
+    ('span', 'popularity'): ('Popularity', _strong_text),
+    ('span', 'members'): ('Members', _strong_text),
+    ('div', 'recommended'): ('Recommended', _strong_text),
+    ('div', 'mixed-feelings'): ('Mixed Feelings', _strong_text),
+    ('div', 'not-recommended'): ('Not Recommended', _strong_text),
+}
+
+DEFAULTS = {
+    "Title": "Unknown Title",
+    "Type": "Unknown",
+    "Score": "N/A",
+    "Rank": "N/A",
+    "Popularity": "N/A",
+    "Members": "N/A",
+    "Favourites": "N/A",
+    "Authors": [],
+    "Synopsis": "N/A",
+    "Genres": [],
+    "Themes": [],
+    "Demographic": "Unknown",
+    "Recommended": "N/A",
+    "Mixed Feelings": "N/A",
+    "Not Recommended": "N/A",
+    "Image URL": "N/A",
+}
+
+
+def _match(tag):
+    """Return (field, getter) for a tag the extractor reads, else None."""
+    classes = tag.get('class') or ()
+    if tag.name == 'span':
+        if 'dark_text' in classes:
+            return SIDEBAR_FIELDS.get(tag.text.strip().rstrip(':'))
+        if 'author' in classes:
+            return 'Authors', _link_texts
+        if 'h1-title' in classes:
+            return 'Title', _title
+        if tag.get('itemprop') == 'name' and 'h1-title' in (tag.parent.get('class') or ()):
+            return FULL_TITLE, _text
+        if tag.get('itemprop') == 'description':
+            return 'Synopsis', _text
+    elif tag.name == 'img' and tag.get('itemprop') == 'image':
+        return 'Image URL', lambda img: img.get('data-src') or img.get('src')
+    for css_class in classes:
+        field = CLASS_FIELDS.get((tag.name, css_class))
+        if field:
+            return field
+    return None
+
+
+def extract_fields(soup):
+    """Fill the manga record in a single walk over the parsed page.
+
+    Every tag is visited once and dispatched on its class (or, for sidebar
+    blocks, on its dark_text label). The first match wins for scalar fields,
+    like select_one; Authors accumulate across every span.author. Time spent
+    in each field's getter is reported to metrics as field:<name>.
+    """
+    record = {}
+    for tag in soup.descendants:
+        if not isinstance(tag, Tag):
+            continue
+        field = _match(tag)
+        if field is None:
+            continue
+        name, getter = field
+        if name in record and name != 'Authors':
+            continue
+        # dark_text labels describe their parent block
+        start = time.perf_counter()
+        value = getter(tag.parent if 'dark_text' in tag.get('class', ()) else tag)
+        metrics.observe(f"field:{name}", time.perf_counter() - start)
+        if value in (None, ''):
+            continue
+        if name == 'Authors':
+            record.setdefault(name, []).extend(value)
+        else:
+            record[name] = value
+    return with_defaults(record)
+
+
+def with_defaults(record):
+    """Order record's fields like DEFAULTS, filling in the ones it lacks."""
+    fields = {name: record.get(name, default) for name, default in DEFAULTS.items()}
+    if record.get(FULL_TITLE):
+        fields[FULL_TITLE] = record[FULL_TITLE]
+    return fields
+
+
+# The same extraction as extract_fields, run inside the browser with
+# execute_script so only the found fields cross the WebDriver wire (instead of
+# the whole page_source) and nothing is parsed in Python. Returns an object
+# with the fields it found; pass it through with_defaults.
+BROWSER_EXTRACT_SCRIPT = """
+const text = (el) => (el ? el.textContent.trim() : null);
+const linkTexts = (el) => Array.from(el.querySelectorAll('a'), (a) => a.textContent.trim());
+const firstLinkText = (el) => text(el.querySelector('a'));
+const firstText = (el) => {
+    const node = Array.from(el.childNodes).find((n) => n.nodeType === Node.TEXT_NODE && n.textContent.trim());
+    return node ? node.textContent.trim() : text(el);
+};
+const textAfterLabel = (el) => {
+    const next = el.querySelector('span.dark_text').nextSibling;
+    return next && next.nodeType === Node.TEXT_NODE ? next.textContent.trim() : null;
+};
+const sidebar = {
+    'Type': ['Type', firstLinkText],
+    'Genre': ['Genres', linkTexts],
+    'Genres': ['Genres', linkTexts],
+    'Theme': ['Themes', linkTexts],
+    'Themes': ['Themes', linkTexts],
+    'Demographic': ['Demographic', firstLinkText],
+    'Demographics': ['Demographic', firstLinkText],
+    'Favorites': ['Favourites', textAfterLabel],
+};
+const record = {};
+const put = (name, value) => {
+    if (!(name in record) && value !== null && value !== '') record[name] = value;
+};
+
+const title = document.querySelector('span.h1-title');
+if (title) put('Title', firstText(title.querySelector('span[itemprop="name"]') || title));
+if (title) put('Full Title', text(title.querySelector('span[itemprop="name"]')));
+for (const label of document.querySelectorAll('span.dark_text')) {
+    const field = sidebar[label.textContent.trim().replace(/:$/, '')];
+    if (field) put(field[0], field[1](label.parentElement));
+}
+const authors = document.querySelectorAll('span.author a');
+if (authors.length) record['Authors'] = Array.from(authors, (a) => a.textContent.trim());
+put('Synopsis', text(document.querySelector('span[itemprop="description"]')));
+const image = document.querySelector('img[itemprop="image"]');
+if (image) put('Image URL', image.getAttribute('data-src') || image.getAttribute('src'));
+put('Score', text(document.querySelector('div.score-label')));
+put('Rank', text(document.querySelector('span.ranked strong')));
+put('Popularity', text(document.querySelector('span.popularity strong')));
+put('Members', text(document.querySelector('span.members strong')));
+put('Recommended', text(document.querySelector('div.recommended strong')));
+put('Mixed Feelings', text(document.querySelector('div.mixed-feelings strong')));
+put('Not Recommended', text(document.querySelector('div.not-recommended strong')));
+return record;
+"""
+
+
+def _classes(attrs):
+    # Strainers see raw attributes, so class is still one space-separated string
+    value = attrs.get('class') or ''
+    return value.split() if isinstance(value, str) else value
+
+
+# Top-level subtrees a detail page is built from: the sidebar blocks, the stats
+# header anchors, title, synopsis, cover image and review summary. Everything
+# else (menus, ads, comments, footer) is never turned into tree nodes.
+DETAIL_CLASSES = {
+    'div': {'spaceit_pad', 'score-label', 'recommended', 'mixed-feelings', 'not-recommended'},
+    'span': {'h1-title', 'author', 'ranked', 'popularity', 'members'},
+}
+
+
+def _detail_subtree(name, attrs):
+    if name in DETAIL_CLASSES and DETAIL_CLASSES[name].intersection(_classes(attrs)):
+        return True
+    return attrs.get('itemprop') in ('description', 'image') and name in ('span', 'img')
+
+
+def _list_subtree(name, attrs):
+    # One <tr class="ranking-list"> per manga on topmanga.php
+    return name == 'tr' and 'ranking-list' in _classes(attrs)
+
+
+DETAIL_STRAINER = SoupStrainer(_detail_subtree)
+LIST_STRAINER = SoupStrainer(_list_subtree)
+
+
+def make_soup(html, parse_only=None):
+    """Parse html with the fastest available tree builder, keeping only parse_only's subtrees."""
+    return BeautifulSoup(html, PARSER, parse_only=parse_only)
+
+
+def parse_manga_html(html):
+    """Parse a detail page and extract its fields."""
+    with metrics.timer('parse'):
+        soup = make_soup(html, DETAIL_STRAINER)
+    with metrics.timer('extract'):
+        return extract_fields(soup)
+
+
+def extract_ranking_row(row):
+    """Read the volatile stats a topmanga.php row shows, in the detail-page formats.
+
+    Returns None for rows without a manga link.
+    """
+    link = row.select_one('td.title a.hoverinfo_trigger')
+    if link is None or parse_manga_id(link['href']) is None:
+        return None
+    rank = row.select_one('td.rank span')
+    score = row.select_one('td.score span.score-label')
+    title = row.select_one('h3.manga_h3 a')
+    information = row.select_one('div.information')
+    # The last line of the information block reads "746,007 members"
+    members = information.get_text('\n').strip().splitlines()[-1] if information else ''
+    return {
+        "MAL ID": parse_manga_id(link['href']),
+        "URL": link['href'],
+        "Title": _text(title) if title else None,
+        "Rank": f"#{_text(rank)}" if rank and _text(rank).isdigit() else "N/A",
+        "Score": _text(score) if score else "N/A",
+        "Members": members.replace('members', '').strip() if 'members' in members else "N/A",
+    }
+
+
+def parse_ranking_rows(html):
+    """Parse a topmanga.php page into one stats dict per ranked manga."""
+    with metrics.timer('parse_list'):
+        rows = (extract_ranking_row(row) for row in make_soup(html, LIST_STRAINER).find_all('tr'))
+        return [row for row in rows if row is not None]
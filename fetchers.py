@@ -0,0 +1,178 @@
+import time
+from email.utils import parsedate_to_datetime
+
+import urllib3
+import metrics
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+from rate_limiter import RateLimiter
+
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+
+
+class FetchError(Exception):
+    """Raised when a page could not be fetched (non-2xx response).
+
+    retry_after holds the seconds a Retry-After header asked for, if any.
+    """
+
+    def __init__(self, url, status, retry_after=None):
+        super().__init__(f"HTTP {status} while fetching {url}")
+        self.url = url
+        self.status = status
+        self.retry_after = retry_after
+
+
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date), or None."""
+    if not value:
+        return None
+    if value.strip().isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class SeleniumFetcher:
+    """Fetch pages by navigating a Selenium WebDriver.
+
+    Behaves like the wrapped driver (``get``, ``page_source``, ``quit`` and any
+    other attribute are forwarded) so existing driver-based code keeps working.
+    With ready_selector, ``get`` returns as soon as that element is in the DOM,
+    which pairs with Chrome's "eager" page-load strategy: the page counts as
+    loaded once the anchors the extractor needs exist, not when every image and
+    ad has finished.
+    """
+
+    def __init__(self, driver, rate_limiter=None, ready_timeout=15):
+        self.driver = driver
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.ready_timeout = ready_timeout
+
+    def get(self, url, ready_selector=None):
+        self.rate_limiter.acquire(url)
+        with metrics.timer('navigate'):
+            self.driver.get(url)
+        self.rate_limiter.record(url, 200)  # WebDriver does not expose the status code
+        metrics.count('pages')
+        if ready_selector:
+            with metrics.timer('wait'):
+                self.wait_until_ready(ready_selector)
+
+    def wait_until_ready(self, ready_selector):
+        """Wait until ready_selector matches; on timeout carry on with what has loaded."""
+        try:
+            WebDriverWait(self.driver, self.ready_timeout).until(
+                EC.presence_of_element_located((By.CSS_SELECTOR, ready_selector))
+            )
+        except TimeoutException:
+            print(f"Timed out waiting for {ready_selector} on {self.driver.current_url}")
+
+    @property
+    def page_source(self):
+        with metrics.timer('page_source'):
+            return self.driver.page_source
+
+    def fetch(self, url, ready_selector=None):
+        """Navigate to url and return the rendered HTML."""
+        self.get(url, ready_selector)
+        return self.page_source
+
+    def evaluate(self, url, script, ready_selector=None):
+        """Navigate to url and return what script (run in the page) returns."""
+        self.get(url, ready_selector)
+        with metrics.timer('evaluate'):
+            return self.driver.execute_script(script)
+
+    def quit(self):
+        self.driver.quit()
+
+    def __getattr__(self, name):
+        return getattr(self.driver, name)
+
+
+class PooledFetcher:
+    """Fetch pages with Selenium sessions leased from a DriverPool.
+
+    Unlike SeleniumFetcher, ``fetch`` is safe to call from several threads
+    at once: each call borrows its own browser for the duration of one page,
+    so the crawl engine can drive up to pool.size browsers in parallel. All
+    sessions share one rate limiter.
+    """
+
+    def __init__(self, pool, rate_limiter=None, ready_timeout=15):
+        self.pool = pool
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.ready_timeout = ready_timeout
+        self.page_source = ""
+        self.current_url = None
+
+    def fetch(self, url, ready_selector=None):
+        """Navigate a pooled browser to url and return the rendered HTML."""
+        with self.pool.lease() as driver:
+            return SeleniumFetcher(driver, self.rate_limiter, self.ready_timeout).fetch(url, ready_selector)
+
+    def evaluate(self, url, script, ready_selector=None):
+        """Navigate a pooled browser to url and return what script returns."""
+        with self.pool.lease() as driver:
+            return SeleniumFetcher(driver, self.rate_limiter, self.ready_timeout).evaluate(url, script, ready_selector)
+
+    def get(self, url, ready_selector=None):
+        """Load url so that page_source holds its HTML, like WebDriver.get."""
+        self.page_source = self.fetch(url, ready_selector)
+        self.current_url = url
+
+    def quit(self):
+        self.pool.close()
+
+
+class HttpFetcher:
+    """Fetch server-rendered pages with plain keep-alive HTTP GETs.
+
+    Mimics the small part of the WebDriver API the scrapers use (``get``,
+    ``page_source``, ``current_url``, ``quit``), so it can be passed wherever a
+    driver is expected. ``fetch`` is stateless and safe to call from several
+    threads at once; the connection pool is shared.
+    """
+
+    def __init__(self, user_agent=USER_AGENT, timeout=30, maxsize=10, rate_limiter=None):
+        self.pool = urllib3.PoolManager(
+            maxsize=maxsize,
+            block=True,  # Never open more than maxsize connections per host
+            headers={"User-Agent": user_agent},
+            timeout=urllib3.Timeout(connect=10, read=timeout),
+            # Only follow redirects here; retrying errors is RetryingFetcher's job
+            retries=urllib3.Retry(total=None, connect=0, read=0, status=0, other=0, redirect=5, raise_on_status=False),
+        )
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.page_source = ""
+        self.current_url = None
+
+    def fetch(self, url, ready_selector=None):
+        """GET url (waiting for the host's rate limit) and return the decoded HTML body.
+
+        ready_selector is accepted for interface parity with SeleniumFetcher; a
+        plain GET returns the complete server-rendered document anyway.
+        """
+        self.rate_limiter.acquire(url)
+        with metrics.timer('navigate'):
+            response = self.pool.request("GET", url)
+        self.rate_limiter.record(url, response.status)
+        if response.status >= 400:
+            raise FetchError(url, response.status, parse_retry_after(response.headers.get("Retry-After")))
+        metrics.count('pages')
+        charset = response.headers.get("Content-Type", "").partition("charset=")[2] or "utf-8"
+        return response.data.decode(charset.strip(), errors="replace")
+
+    def get(self, url, ready_selector=None):
+        """Load url so that page_source holds its HTML, like WebDriver.get."""
+        self.page_source = self.fetch(url)
+        self.current_url = url
+
+    def quit(self):
+        self.pool.clear()
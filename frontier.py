@@ -0,0 +1,175 @@
+import json
+import os
+
+from extractor import parse_manga_id
+
+
+# Journal entries allowed before it is folded into the snapshot, at least
+COMPACT_MIN_EVENTS = 1000
+
+
+class CrawlFrontier:
+    """Crawl progress that survives restarts.
+
+    Holds the list pages still to enumerate, the detail URLs still to fetch,
+    the MAL ids already completed and how many times each URL was attempted.
+    The state lives in a snapshot (rewritten atomically: temp file + fsync +
+    rename) plus a journal of the changes made since (<file>.journal, one
+    fsynced JSON line per change), so recording a completed page costs one
+    short append rather than a rewrite of everything completed so far; the
+    journal is folded into the snapshot once it outgrows the state. After a
+    crash or a hung browser the next run picks up exactly where this one
+    stopped. A URL that has been attempted max_attempts times without
+    completing (e.g. it keeps crashing Chrome) is given up on.
+    """
+
+    def __init__(self, file_path, max_attempts=3):
+        self.file_path = file_path
+        self.journal_path = file_path + '.journal'
+        self.max_attempts = max_attempts
+        self.pending_list_pages = []
+        self.pending_details = []
+        self.completed = set()
+        self.attempts = {}
+        self.journal = None
+        self.journal_events = 0
+        if os.path.exists(file_path):
+            with open(file_path, mode='r', encoding='utf-8') as file:
+                state = json.load(file)
+            self.pending_list_pages = state['pending_list_pages']
+            self.pending_details = state['pending_details']
+            self.completed = set(state['completed'])
+            self.attempts = state['attempts']
+        self._replay()
+
+    def _replay(self):
+        """Apply the journal to the snapshot just loaded."""
+        if not os.path.exists(self.journal_path):
+            return
+        size = 0
+        with open(self.journal_path, mode='rb') as file:
+            for line in file:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    break  # Torn write from a crash; dropped below
+                self._apply(*event)
+                self.journal_events += 1
+                size += len(line)
+        if size < os.path.getsize(self.journal_path):
+            with open(self.journal_path, mode='r+b') as file:
+                file.truncate(size)
+
+    def _apply(self, action, url, value=None):
+        # Every change sets state rather than adjusting it, so replaying a
+        # journal that was already folded into the snapshot is harmless
+        if action == 'attempts':
+            self.attempts[url] = value
+        elif action in ('drop', 'complete'):
+            for pending in (self.pending_list_pages, self.pending_details):
+                if url in pending:
+                    pending.remove(url)
+            self.attempts.pop(url, None)
+            mal_id = parse_manga_id(url) if action == 'complete' else None
+            if mal_id is not None:
+                self.completed.add(mal_id)
+        elif action == 'queue':
+            if url not in self.pending_details and parse_manga_id(url) not in self.completed:
+                self.pending_details.append(url)
+        elif action == 'uncomplete':
+            self.completed.discard(value)
+
+    def _record(self, *events):
+        """Apply events and append them to the journal with one write and fsync."""
+        for event in events:
+            self._apply(*event)
+        if self.journal is None:
+            self.journal = open(self.journal_path, mode='a', encoding='utf-8')
+        self.journal.write(''.join(json.dumps(event) + '\n' for event in events))
+        self.journal.flush()
+        os.fsync(self.journal.fileno())
+        self.journal_events += len(events)
+        size = len(self.pending_list_pages) + len(self.pending_details) + len(self.completed)
+        if self.journal_events > max(COMPACT_MIN_EVENTS, size):
+            self.checkpoint()
+
+    def checkpoint(self):
+        """Write the whole state as a new snapshot and start an empty journal."""
+        state = {
+            'pending_list_pages': self.pending_list_pages,
+            'pending_details': self.pending_details,
+            'completed': sorted(self.completed),
+            'attempts': self.attempts,
+        }
+        tmp_path = self.file_path + '.tmp'
+        with open(tmp_path, mode='w', encoding='utf-8') as file:
+            json.dump(state, file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, self.file_path)
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+        self.journal_events = 0
+
+    def is_finished(self):
+        return not self.pending_list_pages and not self.pending_details
+
+    def plan(self, list_page_urls):
+        """Start a new crawl over list_page_urls (completed ids are kept)."""
+        self.pending_list_pages = list(list_page_urls)
+        self.pending_details = []
+        self.attempts = {}
+        self.checkpoint()
+
+    def add_details(self, urls):
+        """Queue detail URLs discovered on a list page, skipping completed or queued ones.
+
+        Returns the URLs that were newly queued.
+        """
+        queued = set(self.pending_details)
+        added = []
+        for url in urls:
+            if url not in queued and parse_manga_id(url) not in self.completed:
+                queued.add(url)
+                added.append(url)
+        if added:
+            self._record(*(('queue', url) for url in added))
+        return added
+
+    def requeue_missing(self, store, site_url):
+        """Queue again the completed ids whose record never reached the store.
+
+        Stores commit in groups, so a crash can lose records the frontier had
+        already marked complete; their detail pages (site_url/manga/<id>)
+        are fetched again. Returns how many were requeued.
+        """
+        missing = sorted(mal_id for mal_id in self.completed if not store.has_id(mal_id))
+        if not missing:
+            return 0
+        self._record(*(('uncomplete', None, mal_id) for mal_id in missing))
+        return len(self.add_details(f"{site_url}/manga/{mal_id}" for mal_id in missing))
+
+    def list_page_done(self, url):
+        self._record(('drop', url))
+
+    def begin(self, url):
+        """Count an attempt at url, right before fetching it; returns False to give up on it.
+
+        The attempt is journaled before the fetch, so a URL that brings the
+        whole process down is still counted, while URLs a killed run never
+        reached are not.
+        """
+        attempts = self.attempts.get(url, 0) + 1
+        if attempts > self.max_attempts:
+            print(f"Giving up on {url} after {self.max_attempts} attempts")
+            self._record(('drop', url))
+            return False
+        self._record(('attempts', url, attempts))
+        return True
+
+    def complete(self, url):
+        """Mark a detail URL as done."""
+        self._record(('complete', url))
@@ -0,0 +1,167 @@
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+
+# Upper bounds of the latency histogram buckets, in milliseconds
+BUCKETS_MS = (0.1, 0.2, 0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000, math.inf)
+
+
+class Histogram:
+    """Latency histogram over BUCKETS_MS, plus count, total and max."""
+
+    def __init__(self):
+        self.buckets = [0] * len(BUCKETS_MS)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, ms):
+        self.buckets[next(i for i, bound in enumerate(BUCKETS_MS) if ms <= bound)] += 1
+        self.count += 1
+        self.total += ms
+        self.max = max(self.max, ms)
+
+    def merge(self, other):
+        self.buckets = [mine + theirs for mine, theirs in zip(self.buckets, other.buckets)]
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding the given fraction of observations."""
+        rank = fraction * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS_MS, self.buckets):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'mean_ms': self.total / self.count if self.count else 0.0,
+            'p50_ms': self.percentile(0.5),
+            'p95_ms': self.percentile(0.95),
+            'max_ms': self.max,
+            'buckets': {str(bound): count for bound, count in zip(BUCKETS_MS, self.buckets) if count},
+        }
+
+
+class Metrics:
+    """Per-stage latency histograms and event counters for one crawl. Thread-safe.
+
+    Cheap enough to leave on: a timed block costs two perf_counter() calls
+    and a locked histogram update.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.counters = {}
+        self.started = time.monotonic()
+        self.writer = None
+        self.stop_writing = threading.Event()
+
+    def observe(self, stage, seconds):
+        with self.lock:
+            if stage not in self.histograms:
+                self.histograms[stage] = Histogram()
+            self.histograms[stage].observe(seconds * 1000)
+
+    @contextmanager
+    def timer(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def count(self, name, n=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def take(self):
+        """Return the histograms and counters recorded since the last take, and reset them.
+
+        For worker processes, whose registry the parent never sees: send
+        what take returns back with each result and merge it there.
+        """
+        with self.lock:
+            taken = self.histograms, self.counters
+            self.histograms, self.counters = {}, {}
+        return taken
+
+    def merge(self, histograms, counters):
+        """Add histograms and counters taken from another Metrics."""
+        with self.lock:
+            for stage, histogram in histograms.items():
+                self.histograms.setdefault(stage, Histogram()).merge(histogram)
+            for name, n in counters.items():
+                self.counters[name] = self.counters.get(name, 0) + n
+
+    def snapshot(self):
+        with self.lock:
+            minutes = (time.monotonic() - self.started) / 60
+            return {
+                'elapsed_s': minutes * 60,
+                'pages_per_minute': self.counters.get('pages', 0) / minutes if minutes else 0.0,
+                'counters': dict(self.counters),
+                'stages': {stage: histogram.to_dict() for stage, histogram in self.histograms.items()},
+            }
+
+    def summary(self):
+        """Human-readable report: throughput, counters, then stages by total time spent."""
+        snapshot = self.snapshot()
+        lines = [f"{snapshot['counters'].get('pages', 0)} pages in {snapshot['elapsed_s']:.0f}s "
+                 f"({snapshot['pages_per_minute']:.1f} pages/min)"]
+        lines += [f"  {name}: {value}" for name, value in sorted(snapshot['counters'].items())]
+        stages = sorted(snapshot['stages'].items(), key=lambda item: -item[1]['mean_ms'] * item[1]['count'])
+        for stage, stats in stages:
+            lines.append(f"  {stage:24} n={stats['count']:<6} mean {stats['mean_ms']:8.2f} ms  "
+                         f"p50 {stats['p50_ms']:8.2f}  p95 {stats['p95_ms']:8.2f}  max {stats['max_ms']:8.2f}")
+        return "\n".join(lines)
+
+    def write(self, path):
+        """Atomically write a JSON snapshot to path."""
+        tmp_path = path + '.tmp'
+        with open(tmp_path, mode='w', encoding='utf-8') as file:
+            json.dump(self.snapshot(), file, indent=2)
+        os.replace(tmp_path, path)
+
+    def write_periodically(self, path, interval=30.0):
+        """Write a snapshot to path every interval seconds, until stop()."""
+        def run():
+            while not self.stop_writing.wait(interval):
+                self.write(path)
+        self.writer = threading.Thread(target=run, name='metrics-writer', daemon=True)
+        self.writer.start()
+
+    def stop(self, path=None):
+        """Stop the periodic writer, writing a final snapshot to path if given."""
+        self.stop_writing.set()
+        if self.writer is not None:
+            self.writer.join()
+            self.writer = None
+        if path:
+            self.write(path)
+
+
+# Process-wide registry the crawl's modules report to
+METRICS = Metrics()
+
+
+def timer(stage):
+    return METRICS.timer(stage)
+
+
+def observe(stage, seconds):
+    METRICS.observe(stage, seconds)
+
+
+def count(name, n=1):
+    METRICS.count(name, n)
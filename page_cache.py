@@ -0,0 +1,199 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import Counter
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import metrics
+from extractor import parse_manga_id
+
+
+def canonical_url(url):
+    """Normalise a URL so that equivalent spellings share one cache entry.
+
+    Lower-cases scheme and host, drops the fragment and trailing slash, sorts
+    the query string and strips the title slug from /manga/<id>/<slug>, which
+    MAL serves identically with or without it.
+    """
+    parts = urlsplit(url)
+    path = parts.path.rstrip('/') or '/'
+    mal_id = parse_manga_id(path)
+    if mal_id is not None:
+        path = f"/manga/{mal_id}"
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, query, ''))
+
+
+def is_detail_url(url):
+    return parse_manga_id(url) is not None
+
+
+class PageCache:
+    """On-disk cache of raw HTML, gzip-compressed and content-addressed.
+
+    Pages are stored once per distinct body under objects/<sha256>.html.gz; an
+    index maps each canonical URL to its body hash and timestamps. Entries
+    older than ttl seconds are ignored by get() (but still readable with
+    read()), and the least recently used entries are evicted once the
+    compressed blobs exceed max_bytes. Thread-safe.
+    """
+
+    def __init__(self, directory, ttl=7 * 24 * 3600, max_bytes=512 * 1024 * 1024, flush_every=20):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.flush_every = flush_every
+        self.index_path = os.path.join(directory, 'index.json')
+        self.lock = threading.Lock()
+        self.dirty = 0
+        os.makedirs(os.path.join(directory, 'objects'), exist_ok=True)
+        self.entries = self._load_index()
+
+    def _load_index(self):
+        if os.path.exists(self.index_path):
+            with open(self.index_path, mode='r', encoding='utf-8') as file:
+                return json.load(file)
+        return {}
+
+    def _blob_path(self, digest):
+        return os.path.join(self.directory, 'objects', digest[:2], digest + '.html.gz')
+
+    def _read_blob(self, digest):
+        with gzip.open(self._blob_path(digest), mode='rt', encoding='utf-8') as file:
+            return file.read()
+
+    def get(self, url):
+        """Return the cached HTML for url, or None if missing or older than the TTL."""
+        key = canonical_url(url)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or time.time() - entry['fetched_at'] > self.ttl:
+                return None
+            entry['accessed_at'] = time.time()
+            self._mark_dirty()
+            try:
+                return self._read_blob(entry['hash'])
+            except (OSError, EOFError):
+                del self.entries[key]  # Blob went missing or is corrupt; refetch
+                return None
+
+    def read(self, url):
+        """Return the cached HTML for url regardless of age, or None."""
+        with self.lock:
+            entry = self.entries.get(canonical_url(url))
+            return self._read_blob(entry['hash']) if entry else None
+
+    def fetched_at(self, url):
+        """Unix time url was last fetched, or None if it is not cached."""
+        with self.lock:
+            entry = self.entries.get(canonical_url(url))
+            return entry['fetched_at'] if entry else None
+
+    def put(self, url, html):
+        """Store html as the current body of url."""
+        data = html.encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._blob_path(digest)
+        with self.lock:
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = f"{path}.{threading.get_ident()}.tmp"
+                with gzip.open(tmp_path, mode='wb') as file:
+                    file.write(data)
+                os.replace(tmp_path, path)
+            now = time.time()
+            self.entries[canonical_url(url)] = {
+                'hash': digest,
+                'fetched_at': now,
+                'accessed_at': now,
+                'size': os.path.getsize(path),
+            }
+            self._evict()
+            self._mark_dirty()
+
+    def urls(self):
+        """Canonical URLs of every cached page, oldest fetch first."""
+        with self.lock:
+            return sorted(self.entries, key=lambda key: self.entries[key]['fetched_at'])
+
+    def _evict(self):
+        """Drop least recently used entries until the distinct blobs fit in max_bytes."""
+        sizes = {entry['hash']: entry['size'] for entry in self.entries.values()}
+        total = sum(sizes.values())
+        if total <= self.max_bytes:
+            return
+        references = Counter(entry['hash'] for entry in self.entries.values())
+        for key in sorted(self.entries, key=lambda key: self.entries[key]['accessed_at']):
+            digest = self.entries.pop(key)['hash']
+            references[digest] -= 1
+            if references[digest]:
+                continue  # Body still shared with another URL
+            os.remove(self._blob_path(digest))
+            total -= sizes[digest]
+            if total <= self.max_bytes:
+                break
+
+    def _mark_dirty(self):
+        self.dirty += 1
+        if self.dirty >= self.flush_every:
+            self._write_index()
+
+    def _write_index(self):
+        tmp_path = self.index_path + '.tmp'
+        with open(tmp_path, mode='w', encoding='utf-8') as file:
+            json.dump(self.entries, file)
+        os.replace(tmp_path, self.index_path)
+        self.dirty = 0
+
+    def close(self):
+        """Persist the index."""
+        with self.lock:
+            if self.dirty:
+                self._write_index()
+
+
+class CachingFetcher:
+    """Wrap a fetcher so that pages are served from a PageCache before hitting the network.
+
+    With refresh=True the cache is only written: every page is fetched from
+    the network (for runs whose point is fresh data) and the cache updated.
+    """
+
+    def __init__(self, fetcher, cache, refresh=False):
+        self.fetcher = fetcher
+        self.cache = cache
+        self.refresh = refresh
+        self.cached_page = None
+
+    def fetch(self, url, ready_selector=None):
+        html = None if self.refresh else self.cache.get(url)
+        if html is None:
+            html = self.fetcher.fetch(url, ready_selector)
+            self.cache.put(url, html)
+        else:
+            metrics.count('cache_hits')
+        return html
+
+    def get(self, url, ready_selector=None):
+        self.cached_page = None if self.refresh else self.cache.get(url)
+        if self.cached_page is None:
+            self.fetcher.get(url, ready_selector)
+            self.cache.put(url, self.fetcher.page_source)
+        else:
+            metrics.count('cache_hits')
+
+    @property
+    def page_source(self):
+        if self.cached_page is not None:
+            return self.cached_page
+        return self.fetcher.page_source
+
+    def quit(self):
+        self.cache.close()
+        self.fetcher.quit()
+
+    def __getattr__(self, name):
+        return getattr(self.fetcher, name)
@@ -1,12 +1,89 @@
+import argparse
 import json
+import os
 import re
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterable, Iterator, List
+
+SQLITE_EXTENSIONS = ('.sqlite3', '.db')
+READ_CHUNK_SIZE = 1 << 16
 
 def load_data(file_path: str) -> List[Dict[str, Any]]:
-    """Load and preprocess the manga data from a JSON file."""
+    """Load and preprocess the manga data from a JSON, JSONL or SQLite dataset."""
+    return preprocess_data(iter_records(file_path))
+
+def iter_records(file_path: str) -> Iterator[Dict[str, Any]]:
+    """Yield the raw records of a dataset one at a time, whatever its format."""
+    if file_path.endswith(SQLITE_EXTENSIONS):
+        # Imported here: storage itself imports parse_int from this module
+        from storage import iter_sqlite_records
+        return iter_sqlite_records(file_path)
+    if file_path.endswith('.jsonl'):
+        return iter_jsonl(file_path)
+    return iter_json_array(file_path)
+
+def iter_jsonl(file_path: str) -> Iterator[Dict[str, Any]]:
+    """Yield the records of a JSON Lines file, skipping blank lines."""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+def iter_json_array(file_path: str, chunk_size: int = READ_CHUNK_SIZE) -> Iterator[Dict[str, Any]]:
+    """Yield the items of a top-level JSON array without loading the whole file.
+
+    The file is read chunk_size characters at a time and each item is
+    decoded as soon as it is complete, so memory stays bounded by the
+    largest item rather than the file.
+    """
+    decoder = json.JSONDecoder()
     with open(file_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    return preprocess_data(data)
+        buffer, pos, eof = '', 0, False
+        # '[', then 'first' (an item or ']'), then 'separator' and 'item' in turn
+        expected = '['
+
+        def fill() -> bool:
+            nonlocal buffer, pos, eof
+            chunk = f.read(chunk_size)
+            buffer, pos, eof = buffer[pos:] + chunk, 0, not chunk
+            return not eof
+
+        while True:
+            while pos < len(buffer) and buffer[pos].isspace():
+                pos += 1
+            if pos == len(buffer):
+                if fill():
+                    continue
+                if expected is None:
+                    return
+                raise ValueError(f"{file_path}: unexpected end of file, expected a complete JSON array")
+            char = buffer[pos]
+            if expected == '[':
+                if char != '[':
+                    raise ValueError(f"{file_path}: expected a JSON array")
+                pos += 1
+                expected = 'first'
+            elif expected == 'first' and char == ']':
+                pos += 1
+                expected = None
+            elif expected in ('first', 'item'):
+                try:
+                    item, end = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError as e:
+                    if fill():
+                        continue  # Most likely an item cut by the chunk boundary
+                    raise ValueError(f"{file_path}: invalid JSON ({e})") from e
+                if end == len(buffer) and fill():
+                    continue  # A number could continue in the next chunk
+                pos = end
+                expected = 'separator'
+                yield item
+            elif expected == 'separator':
+                if char not in ',]':
+                    raise ValueError(f"{file_path}: expected ',' or ']' between array items")
+                pos += 1
+                expected = 'item' if char == ',' else None
+            else:
+                raise ValueError(f"{file_path}: unexpected data after the JSON array")
 
 def parse_int(value: str) -> int:
     """Strip non‑digits and convert to int, defaulting to 0."""
@@ -14,68 +91,111 @@ def parse_int(value: str) -> int:
     digits = re.sub(r'[^\d]', '', value or '')
     return int(digits) if digits.isdigit() else 0
 
-def preprocess_data(data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+def preprocess_data(data: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
     """Clean and normalize the manga data."""
-    cleaned_data = []
+    return list(clean_records(data))
+
+def clean_records(data: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """Lazily clean and normalize each record of data."""
     for entry in data:
-        cleaned = {}
+        yield clean_record(entry)
 
-        # Title
-        cleaned['Title'] = entry.get('Title', '').strip()
+def clean_record(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """Clean and normalize one manga record."""
+    cleaned = {}
 
-        # Score → float
-        score_str = entry.get('Score', '').strip()
-        cleaned['Score'] = float(score_str) if re.match(r'^\d+(\.\d+)?$', score_str) else 0.0
+    # MAL ID → int, or None for records saved before ids were recorded
+    cleaned['MAL ID'] = entry.get('MAL ID')
 
-        # Rank → int (strip '#')
-        cleaned['Rank'] = parse_int(entry.get('Rank', ''))
+    # Title
+    cleaned['Title'] = entry.get('Title', '').strip()
 
-        # Popularity → int (strip '#')
-        cleaned['Popularity'] = parse_int(entry.get('Popularity', ''))
+    # Score → float
+    score_str = entry.get('Score', '').strip()
+    cleaned['Score'] = float(score_str) if re.match(r'^\d+(\.\d+)?$', score_str) else 0.0
 
-        # Members → int
-        cleaned['Members'] = parse_int(entry.get('Members', ''))
+    # Rank → int (strip '#')
+    cleaned['Rank'] = parse_int(entry.get('Rank', ''))
 
-        # Favourites → int
-        cleaned['Favourites'] = parse_int(entry.get('Favourites', ''))
+    # Popularity → int (strip '#')
+    cleaned['Popularity'] = parse_int(entry.get('Popularity', ''))
 
-        # Recommended / Mixed Feelings / Not Recommended → int
-        cleaned['Recommended']     = parse_int(entry.get('Recommended', ''))
-        cleaned['Mixed Feelings'] = parse_int(entry.get('Mixed Feelings', ''))
-        cleaned['Not Recommended']= parse_int(entry.get('Not Recommended', ''))
+    # Members → int
+    cleaned['Members'] = parse_int(entry.get('Members', ''))
 
-        # Genres → list of lowercase strings
-        genres = entry.get('Genres', [])
-        cleaned['Genres'] = [g.strip().lower() for g in genres] if isinstance(genres, list) else []
+    # Favourites → int
+    cleaned['Favourites'] = parse_int(entry.get('Favourites', ''))
 
-        # Themes → list of lowercase strings
-        themes = entry.get('Themes', [])
-        cleaned['Themes'] = [t.strip().lower() for t in themes] if isinstance(themes, list) else []
+    # Recommended / Mixed Feelings / Not Recommended → int
+    cleaned['Recommended']     = parse_int(entry.get('Recommended', ''))
+    cleaned['Mixed Feelings'] = parse_int(entry.get('Mixed Feelings', ''))
+    cleaned['Not Recommended']= parse_int(entry.get('Not Recommended', ''))
 
-        # Synopsis → single‑line string
-        synopsis = entry.get('Synopsis', '')
-        cleaned['Synopsis'] = re.sub(r'[\r\n]+', ' ', synopsis).strip()
+    # Genres → list of lowercase strings
+    genres = entry.get('Genres', [])
+    cleaned['Genres'] = [g.strip().lower() for g in genres] if isinstance(genres, list) else []
 
-        # Demographic → lowercase, default 'unknown'
-        demo = entry.get('Demographic', '') or 'Unknown'
-        cleaned['Demographic'] = demo.strip().lower()
+    # Themes → list of lowercase strings
+    themes = entry.get('Themes', [])
+    cleaned['Themes'] = [t.strip().lower() for t in themes] if isinstance(themes, list) else []
 
-        # Image URL → keep as‑is
-        cleaned['Image URL'] = entry.get('Image URL', '').strip()
+    # Synopsis → single‑line string
+    synopsis = entry.get('Synopsis', '')
+    cleaned['Synopsis'] = re.sub(r'[\r\n]+', ' ', synopsis).strip()
 
-        cleaned_data.append(cleaned)
+    # Demographic → lowercase, default 'unknown'
+    demo = entry.get('Demographic', '') or 'Unknown'
+    cleaned['Demographic'] = demo.strip().lower()
 
-    return cleaned_data
+    # Image URL → keep as‑is
+    cleaned['Image URL'] = entry.get('Image URL', '').strip()
+
+    return cleaned
 
 def save_cleaned_data(cleaned_data: List[Dict[str, Any]], output_path: str) -> None:
     """Save the cleaned data to a new JSON file."""
     with open(output_path, 'w', encoding='utf-8') as f:
         json.dump(cleaned_data, f, ensure_ascii=False, indent=2)
 
-if __name__ == "__main__":
-    input_file  = "manga_data_new.json"
-    output_file = "cleaned_manga_data.json"
+def stream_cleaned_data(cleaned_data: Iterable[Dict[str, Any]], output_path: str) -> int:
+    """Write records to output_path as they arrive; returns how many were written.
+
+    A .jsonl path gets one record per line; anything else gets the same
+    indented JSON array save_cleaned_data writes. The file is written
+    under a temporary name and renamed once complete.
+    """
+    jsonl = output_path.endswith('.jsonl')
+    encoder = json.JSONEncoder(ensure_ascii=False, indent=None if jsonl else 2)
+    tmp_path = output_path + '.tmp'
+    count = 0
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        for record in cleaned_data:
+            if jsonl:
+                f.write(encoder.encode(record) + '\n')
+            else:
+                f.write(',\n  ' if count else '[\n  ')
+                # Nest one level deeper; encoded strings never contain raw newlines
+                f.write(encoder.encode(record).replace('\n', '\n  '))
+            count += 1
+        if not jsonl:
+            f.write('\n]' if count else '[]')
+    os.replace(tmp_path, output_path)
+    return count
 
-    cleaned = load_data(input_file)
-    save_cleaned_data(cleaned, output_file)
-    print(f"Cleaned data saved to {output_file}")
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Clean the scraped manga dataset.")
+    parser.add_argument('input_file', nargs='?', default="manga_data_new.json",
+                        help="JSON array, JSONL or SQLite dataset")
+    parser.add_argument('output_file', nargs='?', default="cleaned_manga_data.json",
+                        help="JSON array, or JSONL if it ends in .jsonl")
+    parser.add_argument('--in-memory', action='store_true',
+                        help="load the whole dataset before cleaning instead of streaming it")
+    args = parser.parse_args()
+
+    if args.in_memory:
+        cleaned = load_data(args.input_file)
+        save_cleaned_data(cleaned, args.output_file)
+    else:
+        # Constant memory: one record at a time from input to output
+        stream_cleaned_data(clean_records(iter_records(args.input_file)), args.output_file)
+    print(f"Cleaned data saved to {args.output_file}")
@@ -0,0 +1,95 @@
+import threading
+import time
+from urllib.parse import urlsplit
+
+import metrics
+
+
+THROTTLE_STATUSES = (429, 503)
+
+
+class TokenBucket:
+    """Token bucket whose refill rate adapts to server feedback (AIMD).
+
+    Rates are in requests per second. Tokens may go negative: a reservation
+    taken while the bucket is empty books the next free slot, so concurrent
+    callers are spaced out instead of all waking at once.
+    """
+
+    def __init__(self, rate, capacity=1, min_rate=0.05, max_rate=2.0,
+                 increase=0.05, decrease_factor=0.5, success_window=20):
+        self.rate = rate
+        self.capacity = capacity
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+        self.success_window = success_window
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.successes = 0
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, now):
+        """Take one token and return how long to wait before using it."""
+        self._refill(now)
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def on_success(self):
+        """Additive increase after success_window consecutive successes."""
+        self.successes += 1
+        if self.successes >= self.success_window:
+            self.rate = max(self.rate, min(self.max_rate, self.rate + self.increase))
+            self.successes = 0
+
+    def on_throttled(self):
+        """Multiplicative decrease, and drop any saved-up burst."""
+        self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+        self.tokens = min(self.tokens, 0)
+        self.successes = 0
+
+
+class RateLimiter:
+    """Per-host token buckets shared by every fetch of a crawl. Thread-safe."""
+
+    def __init__(self, rate=0.5, **bucket_options):
+        self.rate = rate
+        self.bucket_options = bucket_options
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def _bucket(self, url):
+        host = urlsplit(url).netloc
+        if host not in self.buckets:
+            self.buckets[host] = TokenBucket(self.rate, **self.bucket_options)
+        return self.buckets[host]
+
+    def reserve(self, url):
+        """Book a request to url's host; returns the delay in seconds to honour."""
+        with self.lock:
+            return self._bucket(url).reserve(time.monotonic())
+
+    def acquire(self, url):
+        """Block until a request to url's host is allowed."""
+        delay = self.reserve(url)
+        metrics.observe('rate_limit_wait', delay)
+        if delay > 0:
+            time.sleep(delay)
+
+    def record(self, url, status):
+        """Feed a response status back: 429/503 slow the host down, successes speed it up."""
+        with self.lock:
+            bucket = self._bucket(url)
+            if status in THROTTLE_STATUSES:
+                bucket.on_throttled()
+                print(f"Throttled by {urlsplit(url).netloc} (HTTP {status}), slowing to {bucket.rate:.2f} req/s")
+            elif status < 400:
+                bucket.on_success()
+
+    def current_rate(self, url):
+        with self.lock:
+            return self._bucket(url).rate
@@ -0,0 +1,172 @@
+import random
+import threading
+import time
+from collections import deque
+
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from urllib3.exceptions import HTTPError as TransportError, MaxRetryError, NewConnectionError, TimeoutError as TransportTimeout
+
+from fetchers import FetchError
+
+
+class RetryPolicy:
+    """How often, and how patiently, one class of error is retried.
+
+    Delays use capped exponential backoff with full jitter: retry n waits a
+    random time between 0 and min(max_delay, base_delay * 2 ** n) (counting
+    from 0), so workers that failed together do not retry together.
+    """
+
+    def __init__(self, max_attempts=3, base_delay=1.0, max_delay=60.0):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt):
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+
+# Seconds of jitter added to a Retry-After wait, so clients told the same
+# time do not all come back at once
+RETRY_AFTER_JITTER = 1.0
+
+# Error class -> policy; classes without a policy are not retried
+DEFAULT_POLICIES = {
+    'timeout': RetryPolicy(max_attempts=3, base_delay=2.0),
+    'connection': RetryPolicy(max_attempts=4, base_delay=2.0),
+    'server': RetryPolicy(max_attempts=4, base_delay=5.0),
+    'throttled': RetryPolicy(max_attempts=5, base_delay=30.0, max_delay=300.0),
+    'browser': RetryPolicy(max_attempts=2, base_delay=5.0),
+}
+
+
+def classify(error):
+    """Sort an exception into 'timeout', 'connection', 'server', 'throttled',
+    'browser' or 'client' (a 4xx, or any other error retrying will not fix)."""
+    if isinstance(error, MaxRetryError) and error.reason is not None:
+        error = error.reason
+    if isinstance(error, FetchError):
+        if error.status == 429:
+            return 'throttled'
+        return 'server' if error.status >= 500 else 'client'
+    if isinstance(error, NewConnectionError):
+        return 'connection'  # Checked first: urllib3 makes it a ConnectTimeoutError too
+    if isinstance(error, (TimeoutException, TransportTimeout, TimeoutError)):
+        return 'timeout'
+    if isinstance(error, (TransportError, ConnectionError)):
+        return 'connection'
+    if isinstance(error, WebDriverException):
+        return 'browser'
+    return 'client'
+
+
+class CircuitBreaker:
+    """Pause the whole crawl when too many recent requests fail.
+
+    Tracks the outcome of the last window requests. Once at least
+    min_requests have been seen and failure_rate of them failed, the circuit
+    opens: every caller of wait() blocks for cooldown seconds, so the crawl
+    stops spending its rate budget on requests that are bound to fail. The
+    first request after the pause probes the site (half-open); its success
+    closes the circuit, its failure reopens it. Thread-safe.
+    """
+
+    def __init__(self, window=20, failure_rate=0.5, min_requests=10, cooldown=120.0):
+        self.outcomes = deque(maxlen=window)
+        self.failure_rate = failure_rate
+        self.min_requests = min_requests
+        self.cooldown = cooldown
+        self.opened_at = None
+        self.probing = False
+        self.lock = threading.Lock()
+
+    def wait(self):
+        """Block while the circuit is open."""
+        while True:
+            with self.lock:
+                if self.opened_at is None:
+                    return
+                remaining = self.opened_at + self.cooldown - time.monotonic()
+                if remaining <= 0 and not self.probing:
+                    self.probing = True  # Let exactly one request through to probe
+                    return
+            time.sleep(max(remaining, 1.0))
+
+    def record(self, success):
+        with self.lock:
+            if self.probing:
+                self.probing = False
+                if success:
+                    print("Circuit breaker closed, resuming the crawl")
+                    self.opened_at = None
+                    self.outcomes.clear()
+                else:
+                    self.opened_at = time.monotonic()
+                return
+            self.outcomes.append(success)
+            failures = self.outcomes.count(False)
+            if (self.opened_at is None and len(self.outcomes) >= self.min_requests
+                    and failures >= self.failure_rate * len(self.outcomes)):
+                print(f"Circuit breaker opened: {failures} of the last {len(self.outcomes)} requests failed, "
+                      f"pausing for {self.cooldown:.0f}s")
+                self.opened_at = time.monotonic()
+
+
+class RetryingFetcher:
+    """Wrap a fetcher so that transient errors are retried and failure spikes pause the crawl.
+
+    Each error is classified (see classify) and retried under its class's
+    policy, except that an error with a Retry-After header waits as long as
+    it asks (plus up to RETRY_AFTER_JITTER) instead of backing off. 4xx
+    errors other than 429 are raised at once. Every attempt goes through the
+    circuit breaker, which is shared by all threads using this fetcher.
+    """
+
+    def __init__(self, fetcher, policies=None, breaker=None):
+        self.fetcher = fetcher
+        self.policies = DEFAULT_POLICIES if policies is None else policies
+        self.breaker = breaker or CircuitBreaker()
+
+    def _call(self, url, method, *args):
+        attempt = 0
+        while True:
+            self.breaker.wait()
+            try:
+                result = method(url, *args)
+            except Exception as e:
+                error_class = classify(e)
+                # A client error (e.g. 404) still means the site is answering
+                self.breaker.record(error_class == 'client')
+                policy = self.policies.get(error_class)
+                attempt += 1
+                if policy is None or attempt >= policy.max_attempts:
+                    raise
+                retry_after = getattr(e, 'retry_after', None)
+                if retry_after is not None:
+                    delay = retry_after + random.uniform(0, RETRY_AFTER_JITTER)
+                else:
+                    delay = policy.delay(attempt - 1)
+                print(f"Retrying {url} in {delay:.1f}s after {error_class} error ({attempt}/{policy.max_attempts}): {e}")
+                time.sleep(delay)
+                continue
+            self.breaker.record(True)
+            return result
+
+    def fetch(self, url, ready_selector=None):
+        return self._call(url, self.fetcher.fetch, ready_selector)
+
+    def get(self, url, ready_selector=None):
+        return self._call(url, self.fetcher.get, ready_selector)
+
+    def evaluate(self, url, script, ready_selector=None):
+        return self._call(url, self.fetcher.evaluate, script, ready_selector)
+
+    @property
+    def page_source(self):
+        return self.fetcher.page_source
+
+    def quit(self):
+        self.fetcher.quit()
+
+    def __getattr__(self, name):
+        return getattr(self.fetcher, name)
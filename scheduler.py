@@ -0,0 +1,46 @@
+import heapq
+import math
+from datetime import datetime, timezone
+
+from preprocess_dataset import parse_int
+
+
+def utc_now():
+    return datetime.now(timezone.utc)
+
+
+def timestamp(when=None):
+    """ISO-8601 UTC timestamp, as stored in a record's "Last Fetched" field."""
+    return (when or utc_now()).isoformat(timespec='seconds')
+
+
+def staleness_hours(manga_data, now):
+    """Hours since the record's detail page was fetched; records never stamped count from the epoch."""
+    fetched = manga_data.get('Last Fetched')
+    fetched_at = datetime.fromisoformat(fetched) if fetched else datetime.fromtimestamp(0, timezone.utc)
+    return max(0.0, (now - fetched_at).total_seconds() / 3600)
+
+
+def popularity_weight(manga_data):
+    """Grows with audience size: log-scaled Members, else derived from the Popularity rank."""
+    members = parse_int(manga_data.get('Members', ''))
+    if not members:
+        rank = parse_int(manga_data.get('Popularity', ''))
+        members = 1_000_000 / rank if rank else 0
+    return 1 + math.log10(1 + members)
+
+
+def recrawl_priority(manga_data, now):
+    """Stale records of popular manga first: their numbers drift the most."""
+    return staleness_hours(manga_data, now) * popularity_weight(manga_data)
+
+
+def plan_recrawl(records, budget, now=None):
+    """Pick the `budget` records most worth re-fetching, highest priority first.
+
+    Records without a MAL id are skipped: there is no detail URL to build for
+    them until a regular crawl records their id.
+    """
+    now = now or utc_now()
+    candidates = (manga for manga in records if manga.get('MAL ID') is not None)
+    return heapq.nlargest(budget, candidates, key=lambda manga: recrawl_priority(manga, now))
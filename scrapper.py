@@ -1,11 +1,11 @@
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
-from bs4 import BeautifulSoup
-import time
-import json
-import os  # To check if the file exists
-import random
+from extractor import DETAIL_STRAINER, LIST_STRAINER, make_soup, parse_manga_id
+from fetchers import SeleniumFetcher
+from rate_limiter import RateLimiter
+from retry import RetryingFetcher
+from storage import load_existing_data, save_data_to_file
 
 # Initialize Selenium with headless options and user-agent
 options = Options()
@@ -15,27 +15,30 @@ options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) Apple
 service = Service(executable_path="chromedriver.exe")
 driver = webdriver.Chrome(service=service, options=options)
 
+# Per-host token bucket shared by every page load (slows down on 429/503, speeds up on success),
+# with transient errors retried with backoff before a page is given up on
+rate_limiter = RateLimiter()
+fetcher = RetryingFetcher(SeleniumFetcher(driver, rate_limiter))
+
 # Path to the JSON file
 file_path = 'manga_data.json'
 
 # Load existing data if file exists, otherwise create an empty list
-if os.path.exists(file_path):
-    with open(file_path, mode='r', encoding='utf-8') as file:
-        try:
-            data = json.load(file)  # Load existing data
-        except json.JSONDecodeError:
-            data = []  # If file is empty or has invalid format, initialize an empty list
-else:
-    data = []
+# (a corrupt file stops the script instead of being replaced by an empty list)
+data = load_existing_data(file_path)
+
+# Hash indexes of what is already saved, for O(1) duplicate checks
+known_ids = {manga['MAL ID'] for manga in data if manga.get('MAL ID') is not None}
+# Titles only for records saved without an id: different manga can share a title
+known_titles = {manga['Title'] for manga in data if manga.get('MAL ID') is None}
 
 # Step 1: Scrape the top 50 manga links from the Top Manga page
 top_manga_url = "https://myanimelist.net/topmanga.php"
-driver.get(top_manga_url)
-time.sleep(random.uniform(5, 15))  # Random delay between 5 and 15 seconds
+fetcher.get(top_manga_url)
 
-# Get page source and parse with BeautifulSoup
+# Get page source and parse only the ranking title cells
 html = driver.page_source
-soup = BeautifulSoup(html, 'html.parser')
+soup = make_soup(html, LIST_STRAINER)
 
 # Find all links to individual manga pages
 manga_links = []
@@ -53,18 +56,21 @@ for link in manga_links:
 
 # Step 2: Loop through each manga link and scrape the data
 for url in manga_links:
+    if parse_manga_id(url) in known_ids:
+        print(f"Skipping {url}, already in the dataset")  # Known id: no need to load the page
+        continue
+
     print(f"Processing: {url}")  # Debug print to show the current link being processed
 
     try:
-        # Open the MyAnimeList manga page
-        driver.get(url)
-        time.sleep(random.uniform(5, 15))  # Random delay for page load
+        # Open the MyAnimeList manga page once the rate limiter allows it (retrying transient errors)
+        fetcher.get(url)
 
         # Get page source
         html = driver.page_source
 
-        # Parse the HTML with BeautifulSoup
-        soup = BeautifulSoup(html, 'html.parser')
+        # Parse only the page sections the fields below are read from
+        soup = make_soup(html, DETAIL_STRAINER)
 
         # Extracting the data from the page
         # Extract the manga title (Japanese) if available, ignore the English title
@@ -165,7 +171,9 @@ for url in manga_links:
             not_recommended_value = "N/A"
 
         # Data dictionary with authors, genres, themes, and demographic
+        mal_id = parse_manga_id(url)
         manga_data = {
+            "MAL ID": mal_id,
             "Title": title,
             "Type": manga_type,
             "Score": score,
@@ -184,25 +192,20 @@ for url in manga_links:
         }
 
         # Append the new manga data to the existing list
-        # Check if the title already exists in the data
-        exists = False
-        for manga in data:
-            if manga['Title'] == title:
-                exists = True
-                break
+        # Check if the manga already exists in the data (by MAL id, or title for records without one)
+        exists = mal_id in known_ids or title in known_titles
 
         if not exists:
             data.append(manga_data)
+            known_ids.add(mal_id)
             number_processed += 1
             print("=========================")
             print(number_processed, ". ", title, "Successfully added")  # Debug print for successful addition        
             
 
-            # Save the updated list to the file incrementally
-            with open(file_path, mode='w', encoding='utf-8') as file:
-                json.dump(data, file, ensure_ascii=False, indent=4)
-                print(f"Data saved to {file_path}")  # Debug print after saving
-                print("=========================")
+            # Save the updated list to the file incrementally (temp file + rename, never truncated in place)
+            save_data_to_file(data, file_path)
+            print("=========================")
         else:
             print(title, "Already exists in the dataset")
             print("=========================")
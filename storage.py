@@ -0,0 +1,630 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+import metrics
+from preprocess_dataset import parse_int
+
+
+def load_existing_data(file_path):
+    """Load existing manga data from JSON file or initialize empty list.
+
+    A missing or empty file means no data yet. A file that holds something
+    but is not valid JSON raises ValueError instead of being treated as
+    empty, so the next save cannot overwrite the dataset with a fresh list.
+    """
+    if os.path.exists(file_path):
+        with open(file_path, mode='r', encoding='utf-8') as file:
+            content = file.read()
+        if not content.strip():
+            return []
+        try:
+            return json.loads(content)  # Load existing data
+        except json.JSONDecodeError as e:
+            raise ValueError(f"{file_path} is not valid JSON ({e}); fix or move it aside before crawling") from e
+    return []
+
+
+def save_data_to_file(data, file_path):
+    """Save manga data to JSON file atomically.
+
+    The data goes to a temporary file that is fsynced and then renamed over
+    file_path, so a crash mid-write leaves the previous version intact.
+    """
+    tmp_path = file_path + '.tmp'
+    with open(tmp_path, mode='w', encoding='utf-8') as file:
+        json.dump(data, file, ensure_ascii=False, indent=4)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_path, file_path)
+    print(f"Data saved to {file_path}")
+
+
+# Version of the keys record_keys produces, saved with persisted indexes
+INDEX_VERSION = 2
+
+
+def file_stamp(path):
+    """Modification time and size of path, to tell whether it changed since."""
+    stat = os.stat(path)
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+# Lookup-only key manga_record sets on a freshly parsed record when the full
+# span[itemprop=name] text differs from its Title: older scraper versions
+# saved that text as the Title. stored_record drops it before saving.
+LEGACY_TITLE = '_legacy_title'
+
+
+def stored_record(record):
+    """record as it is saved, without the lookup-only LEGACY_TITLE."""
+    if LEGACY_TITLE not in record:
+        return record
+    return {name: value for name, value in record.items() if name != LEGACY_TITLE}
+
+
+def record_keys(record):
+    """Index key a stored record is found by: its MAL id, or its title if it has none."""
+    if record.get('MAL ID') is not None:
+        return [f"id:{record['MAL ID']}"]
+    return [f"title:{record['Title']}"]
+
+
+def lookup_keys(record):
+    """Keys that find the stored version of record, most specific first.
+
+    Titles are only indexed for records saved before MAL ids were recorded,
+    so a title match can never merge two different manga sharing a title
+    (e.g. a manga and its light novel); it only finds the id-less record
+    this one supersedes, under either its Title or its LEGACY_TITLE.
+    """
+    keys = [f"title:{record['Title']}"]
+    if record.get(LEGACY_TITLE):
+        keys.append(f"title:{record[LEGACY_TITLE]}")
+    if record.get('MAL ID') is not None:
+        keys.insert(0, f"id:{record['MAL ID']}")
+    return keys
+
+
+def _reindex(index, record, position):
+    """Point record's key at position, dropping the title key it superseded."""
+    for key in lookup_keys(record):
+        if index.get(key) == position:
+            del index[key]
+    for key in record_keys(record):
+        index[key] = position
+
+
+class JsonArrayStore:
+    """The original format: one JSON array, rewritten in full by a background writer.
+
+    An in-memory hash index (key -> position in records) makes membership
+    checks O(1), and added records are visible to them at once. Writing is
+    group-committed: a writer thread rewrites the file (atomically, see
+    save_data_to_file) once flush_every records are pending or the oldest
+    pending one is flush_interval seconds old, so adding never waits on the
+    disk. A crash loses at most the records added since the last commit.
+    A failed commit keeps its records pending for the next one, and its
+    error is raised by the next add_many (or by close, if it never
+    succeeds). Thread-safe.
+    """
+
+    def __init__(self, file_path, flush_every=50, flush_interval=5.0):
+        self.file_path = file_path
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.records = load_existing_data(file_path)
+        self.index = {}
+        for position, record in enumerate(self.records):
+            for key in record_keys(record):
+                self.index[key] = position
+        self.lock = threading.Condition()
+        self.pending = 0
+        self.closing = False
+        self.error = None
+        self.writer = threading.Thread(target=self._write_loop, name='json-writer', daemon=True)
+        self.writer.start()
+
+    def _write_loop(self):
+        while True:
+            with self.lock:
+                deadline = None
+                while not self.closing and self.pending < self.flush_every:
+                    if self.pending and deadline is None:
+                        deadline = time.monotonic() + self.flush_interval
+                    timeout = None if deadline is None else deadline - time.monotonic()
+                    if timeout is not None and timeout <= 0:
+                        break
+                    self.lock.wait(timeout)
+                if not self.pending:
+                    if self.closing:
+                        return
+                    continue
+                snapshot, written, self.pending = list(self.records), self.pending, 0
+            try:
+                with metrics.timer('save'):
+                    save_data_to_file(snapshot, self.file_path)
+            except Exception as e:
+                print(f"Error saving {self.file_path}: {e}")
+                with self.lock:
+                    self.pending += written
+                    self.error = e
+                    if self.closing:
+                        return
+                    # Retry with the next add, or after flush_interval
+                    self.lock.wait(self.flush_interval)
+            else:
+                with self.lock:
+                    self.error = None
+
+    def _find(self, record):
+        for key in lookup_keys(record):
+            if key in self.index:
+                return self.index[key]
+        return None
+
+    def __contains__(self, record):
+        return self._find(record) is not None
+
+    def __len__(self):
+        return len(self.records)
+
+    def has_id(self, mal_id):
+        return f"id:{mal_id}" in self.index
+
+    def get_by_id(self, mal_id):
+        position = self.index.get(f"id:{mal_id}")
+        return None if position is None else self.records[position]
+
+    def add(self, record):
+        """Add record, or replace the stored version of the same manga."""
+        self.add_many([record])
+
+    def add_many(self, records):
+        """Add or replace several records; the writer thread commits them."""
+        if not records:
+            return
+        with self.lock:
+            if self.error is not None:
+                error, self.error = self.error, None
+                raise error
+            for record in records:
+                position = self._find(record)
+                if position is None:
+                    position = len(self.records)
+                    self.records.append(stored_record(record))
+                else:
+                    self.records[position] = stored_record(record)
+                _reindex(self.index, record, position)
+            self.pending += len(records)
+            self.lock.notify()
+        metrics.count('records_saved', len(records))
+
+    def close(self):
+        """Commit pending records and stop the writer; raise if that commit failed."""
+        with self.lock:
+            self.closing = True
+            self.lock.notify()
+        self.writer.join()
+        if self.error is not None:
+            raise self.error
+
+
+class JsonlStore:
+    """Append-only JSON Lines store: adding a record writes exactly one line.
+
+    A later line for the same manga supersedes earlier ones. The store keeps
+    only a hash index in memory (key -> record slot -> byte offset of its
+    latest line), persisted next to the log as <file>.idx so reopening a large
+    log does not re-read it; records themselves are read from disk on demand.
+    The log is compacted (rewritten with one line per record) once superseded
+    lines make up more than compact_ratio of it, and on close() the records
+    are exported as the usual JSON array to export_path, if given, unless that
+    file was changed since the log last exported it (e.g. by a storage="json"
+    run), which is reported instead of overwritten. A crash can lose at most
+    the line being written; a torn last line is dropped on load. Thread-safe.
+    """
+
+    def __init__(self, file_path, export_path=None, compact_ratio=0.5, fsync=False):
+        self.file_path = file_path
+        self.index_path = file_path + '.idx'
+        self.export_path = export_path
+        self.compact_ratio = compact_ratio
+        self.fsync = fsync
+        self.index = {}    # key -> slot
+        self.offsets = []  # slot -> byte offset of the latest line, slots in first-seen order
+        self.lines = 0
+        self.size = 0      # bytes of the log covered by the index
+        self.exported = None  # file_stamp() of export_path when the log last matched it
+        self.lock = threading.RLock()
+        if not os.path.exists(file_path) and export_path and os.path.exists(export_path):
+            self._seed_from_json(export_path)
+        if not self._load_index():
+            self.index, self.offsets, self.lines, self.size = {}, [], 0, 0
+        self._scan()
+        self.file = open(file_path, mode='ab')
+
+    def _seed_from_json(self, json_path):
+        """Start the log from an existing JSON array dataset (atomically, like save_data_to_file)."""
+        tmp_path = self.file_path + '.tmp'
+        with open(tmp_path, mode='w', encoding='utf-8') as file:
+            for record in load_existing_data(json_path):
+                file.write(json.dumps(record, ensure_ascii=False) + '\n')
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, self.file_path)
+        self.exported = file_stamp(json_path)
+
+    def _load_index(self):
+        """Load the persisted index if it still matches the log. Returns True if usable."""
+        if not os.path.exists(self.index_path) or not os.path.exists(self.file_path):
+            return False
+        with open(self.index_path, mode='r', encoding='utf-8') as file:
+            try:
+                saved = json.load(file)
+            except json.JSONDecodeError:
+                return False
+        self.exported = self.exported or saved.get('exported')
+        if saved.get('version') != INDEX_VERSION:
+            return False  # Keyed differently; rebuilt from the log
+        self.index, self.offsets = saved['index'], saved['offsets']
+        self.lines, self.size = saved['lines'], saved['size']
+        if self.size > os.path.getsize(self.file_path):
+            return False  # The log was rewritten after the index was saved
+        if self.offsets:
+            # Spot-check that the newest indexed line is where the index says
+            newest = max(self.offsets)
+            try:
+                record = self._read_at(newest)
+            except ValueError:
+                return False
+            if self.index.get(record_keys(record)[0]) != self.offsets.index(newest):
+                return False
+        return True
+
+    def _scan(self):
+        """Index lines appended after self.size, truncating a torn last line."""
+        if not os.path.exists(self.file_path):
+            return
+        with open(self.file_path, mode='rb') as file:
+            file.seek(self.size)
+            for line in file:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break  # Torn write from a crash; everything after it is dropped
+                self._remember(record, self.size)
+                self.size += len(line)
+                self.lines += 1
+        if self.size < os.path.getsize(self.file_path):
+            print(f"Dropping incomplete last line of {self.file_path}")
+            with open(self.file_path, mode='r+b') as file:
+                file.truncate(self.size)
+
+    def _remember(self, record, offset):
+        slot = next((self.index[key] for key in lookup_keys(record) if key in self.index), None)
+        if slot is None:
+            slot = len(self.offsets)
+            self.offsets.append(offset)
+        else:
+            self.offsets[slot] = offset
+        _reindex(self.index, record, slot)
+
+    def _read_at(self, offset):
+        with open(self.file_path, mode='rb') as file:
+            file.seek(offset)
+            return json.loads(file.readline())
+
+    def _save_index(self):
+        tmp_path = self.index_path + '.tmp'
+        with open(tmp_path, mode='w', encoding='utf-8') as file:
+            json.dump({'version': INDEX_VERSION, 'exported': self.exported, 'size': self.size, 'lines': self.lines, 'offsets': self.offsets, 'index': self.index}, file)
+        os.replace(tmp_path, self.index_path)
+
+    def __contains__(self, record):
+        with self.lock:
+            return any(key in self.index for key in lookup_keys(record))
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def has_id(self, mal_id):
+        with self.lock:
+            return f"id:{mal_id}" in self.index
+
+    def get_by_id(self, mal_id):
+        with self.lock:
+            slot = self.index.get(f"id:{mal_id}")
+            return None if slot is None else self._read_at(self.offsets[slot])
+
+    @property
+    def records(self):
+        """Latest version of every record, in first-seen order (read from disk)."""
+        with self.lock:
+            return self._read_records()
+
+    def _read_records(self):
+        if not self.file.closed:
+            self.file.flush()
+        with open(self.file_path, mode='rb') as file:
+            records = []
+            for offset in self.offsets:
+                file.seek(offset)
+                records.append(json.loads(file.readline()))
+            return records
+
+    def add(self, record):
+        """Append record (or a newer version of an existing one) as one line."""
+        self.add_many([record])
+
+    def add_many(self, records):
+        """Append several records with one write (and at most one fsync)."""
+        if not records:
+            return
+        lines = [(json.dumps(stored_record(record), ensure_ascii=False) + '\n').encode('utf-8') for record in records]
+        with self.lock:
+            with metrics.timer('save'):
+                self.file.write(b''.join(lines))
+                self.file.flush()
+                if self.fsync:
+                    os.fsync(self.file.fileno())
+            for record, line in zip(records, lines):
+                self._remember(record, self.size)
+                self.size += len(line)
+                self.lines += 1
+            if self.lines - len(self.offsets) > self.compact_ratio * self.lines:
+                self.compact()
+        metrics.count('records_saved', len(records))
+
+    def compact(self):
+        """Rewrite the log with only the latest line per record."""
+        with self.lock:
+            records = self._read_records()
+            self.file.close()
+            tmp_path = self.file_path + '.tmp'
+            offsets, size = [], 0
+            with open(tmp_path, mode='wb') as file:
+                for record in records:
+                    line = (json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8')
+                    offsets.append(size)
+                    file.write(line)
+                    size += len(line)
+            os.replace(tmp_path, self.file_path)
+            self.offsets, self.size, self.lines = offsets, size, len(records)
+            self._save_index()
+            self.file = open(self.file_path, mode='ab')
+
+    def export_json(self, output_path):
+        """Write the records in the JSON array format the rest of the project reads."""
+        save_data_to_file(self.records, output_path)
+
+    def close(self):
+        with self.lock:
+            self.file.close()
+            if self.export_path:
+                self._export()
+            self._save_index()
+
+    def _export(self):
+        if os.path.exists(self.export_path) and file_stamp(self.export_path) != self.exported and (
+                # A log from before stamps were kept: refuse only if records would be lost
+                self.exported is not None or any(
+                    not any(key in self.index for key in lookup_keys(record))
+                    for record in load_existing_data(self.export_path))):
+            print(f"Not exporting to {self.export_path}: it changed after {self.file_path} last exported it "
+                  f"(e.g. in a storage=\"json\" run). Records are kept in {self.file_path}; "
+                  f"move {self.export_path} aside to export them.")
+            return
+        self.export_json(self.export_path)
+        self.exported = file_stamp(self.export_path)
+
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS manga (
+    id INTEGER PRIMARY KEY,
+    mal_id INTEGER UNIQUE,
+    title TEXT NOT NULL,
+    type TEXT,
+    score REAL,
+    rank INTEGER,
+    popularity INTEGER,
+    members INTEGER,
+    favourites INTEGER,
+    demographic TEXT,
+    last_fetched TEXT,
+    record TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS manga_title ON manga (title);
+CREATE INDEX IF NOT EXISTS manga_rank ON manga (rank);
+CREATE INDEX IF NOT EXISTS manga_popularity ON manga (popularity);
+CREATE INDEX IF NOT EXISTS manga_score ON manga (score);
+CREATE INDEX IF NOT EXISTS manga_type ON manga (type);
+"""
+
+# Record list field -> (name table, link table) normalising it
+SQLITE_LINK_TABLES = {
+    'Genres': ('genre', 'manga_genre'),
+    'Themes': ('theme', 'manga_theme'),
+    'Authors': ('author', 'manga_author'),
+}
+
+
+def _sqlite_rank(value):
+    # '#12' -> 12; 'N/A' -> NULL, so unranked manga sort apart instead of as 0
+    return parse_int(value) or None
+
+
+def _sqlite_score(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class SqliteStore:
+    """SQLite store: one row per manga, indexed for queries without loading the dataset.
+
+    Scalar fields get typed, indexed columns (rank, popularity, score, type);
+    genres, themes and authors are normalised into name and link tables; the
+    full record is kept as JSON so it reads back exactly as it was added.
+    Rows are keyed by MAL id; records saved before ids were recorded are
+    matched by title. The database runs in WAL mode, so readers (e.g. the
+    preprocess step) never block the crawl, and add_many writes a whole
+    batch in one transaction. If the database is new and seed_path names an
+    existing JSON dataset, that dataset is imported first. Thread-safe.
+    """
+
+    def __init__(self, file_path, seed_path=None):
+        self.file_path = file_path
+        is_new = not os.path.exists(file_path)
+        self.connection = sqlite3.connect(file_path, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        with self.connection:
+            self.connection.executescript(SQLITE_SCHEMA)
+            for names, links in SQLITE_LINK_TABLES.values():
+                self.connection.execute(f"CREATE TABLE IF NOT EXISTS {names} (id INTEGER PRIMARY KEY, name TEXT UNIQUE NOT NULL)")
+                self.connection.execute(
+                    f"CREATE TABLE IF NOT EXISTS {links} (manga_id INTEGER NOT NULL REFERENCES manga (id), "
+                    f"{names}_id INTEGER NOT NULL REFERENCES {names} (id), PRIMARY KEY (manga_id, {names}_id))"
+                )
+                self.connection.execute(f"CREATE INDEX IF NOT EXISTS {links}_{names} ON {links} ({names}_id)")
+        if is_new and seed_path and os.path.exists(seed_path):
+            self.add_many(load_existing_data(seed_path))
+
+    def _row_id(self, record):
+        if record.get('MAL ID') is not None:
+            row = self.connection.execute("SELECT id FROM manga WHERE mal_id = ?", (record['MAL ID'],)).fetchone()
+            if row:
+                return row[0]
+        # Only rows without a MAL id are matched by title (see lookup_keys)
+        for title in (record['Title'], record.get(LEGACY_TITLE)):
+            if title:
+                row = self.connection.execute(
+                    "SELECT id FROM manga WHERE title = ? AND mal_id IS NULL", (title,)
+                ).fetchone()
+                if row:
+                    return row[0]
+        return None
+
+    def __contains__(self, record):
+        with self.lock:
+            return self._row_id(record) is not None
+
+    def __len__(self):
+        with self.lock:
+            return self.connection.execute("SELECT COUNT(*) FROM manga").fetchone()[0]
+
+    def has_id(self, mal_id):
+        with self.lock:
+            return self.connection.execute("SELECT 1 FROM manga WHERE mal_id = ?", (mal_id,)).fetchone() is not None
+
+    def get_by_id(self, mal_id):
+        with self.lock:
+            row = self.connection.execute("SELECT record FROM manga WHERE mal_id = ?", (mal_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def iter_records(self, batch_size=500):
+        """Yield every record in insertion order, batch_size rows at a time."""
+        return _sqlite_records(self.connection, self.lock, batch_size)
+
+    @property
+    def records(self):
+        return list(self.iter_records())
+
+    def add(self, record):
+        """Add record, or replace the stored version of the same manga."""
+        self.add_many([record])
+
+    def add_many(self, records):
+        """Add or replace several records in a single transaction."""
+        if not records:
+            return
+        with self.lock, metrics.timer('save'), self.connection:
+            for record in records:
+                self._upsert(record)
+        metrics.count('records_saved', len(records))
+
+    def _upsert(self, record):
+        values = (
+            record.get('MAL ID'), record['Title'], record.get('Type'), _sqlite_score(record.get('Score')),
+            _sqlite_rank(record.get('Rank')), _sqlite_rank(record.get('Popularity')),
+            parse_int(record.get('Members')), parse_int(record.get('Favourites')),
+            record.get('Demographic'), record.get('Last Fetched'), json.dumps(stored_record(record), ensure_ascii=False),
+        )
+        row_id = self._row_id(record)
+        if row_id is None:
+            row_id = self.connection.execute(
+                "INSERT INTO manga (mal_id, title, type, score, rank, popularity, members, favourites, "
+                "demographic, last_fetched, record) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", values
+            ).lastrowid
+        else:
+            self.connection.execute(
+                "UPDATE manga SET mal_id = ?, title = ?, type = ?, score = ?, rank = ?, popularity = ?, members = ?, "
+                "favourites = ?, demographic = ?, last_fetched = ?, record = ? WHERE id = ?", values + (row_id,)
+            )
+        for field, (names, links) in SQLITE_LINK_TABLES.items():
+            self.connection.execute(f"DELETE FROM {links} WHERE manga_id = ?", (row_id,))
+            for name in set(record.get(field) or ()):
+                self.connection.execute(f"INSERT OR IGNORE INTO {names} (name) VALUES (?)", (name,))
+                self.connection.execute(
+                    f"INSERT INTO {links} (manga_id, {names}_id) SELECT ?, id FROM {names} WHERE name = ?",
+                    (row_id, name),
+                )
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+
+def _sqlite_records(connection, lock, batch_size):
+    last_id = 0
+    while True:
+        with lock:
+            rows = connection.execute(
+                "SELECT id, record FROM manga WHERE id > ? ORDER BY id LIMIT ?", (last_id, batch_size)
+            ).fetchall()
+        if not rows:
+            return
+        for last_id, record in rows:
+            yield json.loads(record)
+
+
+def iter_sqlite_records(db_path, batch_size=500):
+    """Iterate over the records of a SqliteStore database without loading them all.
+
+    The database is opened read-only, never created or migrated, so a wrong
+    path raises FileNotFoundError here rather than reading as empty.
+    """
+    if not os.path.isfile(db_path):
+        raise FileNotFoundError(f"No SQLite dataset at {db_path}")
+    connection = sqlite3.connect(Path(os.path.abspath(db_path)).as_uri() + '?mode=ro', uri=True)
+
+    def records():
+        try:
+            yield from _sqlite_records(connection, threading.Lock(), batch_size)
+        finally:
+            connection.close()
+    return records()
+
+
+def open_store(file_path, storage="json"):
+    """Open the record store for a dataset path ending in .json.
+
+    storage="json" rewrites the array file itself, atomically and in group
+    commits from a background writer (see JsonArrayStore); storage="jsonl" appends to a sibling .jsonl log and exports the array
+    to file_path when closed; storage="sqlite" keeps the records in a
+    sibling .sqlite3 database (seeded from file_path on first use) and
+    does not export the array.
+    """
+    if storage == "json":
+        return JsonArrayStore(file_path)
+    if storage == "jsonl":
+        return JsonlStore(os.path.splitext(file_path)[0] + '.jsonl', export_path=file_path)
+    if storage == "sqlite":
+        return SqliteStore(os.path.splitext(file_path)[0] + '.sqlite3', seed_path=file_path)
+    raise ValueError(f"Unknown storage backend: {storage}")
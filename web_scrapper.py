@@ -1,55 +1,136 @@
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from bs4 import BeautifulSoup
-import time
-import json
+from fetchers import HttpFetcher, PooledFetcher, SeleniumFetcher
+from driver_pool import DriverPool
+from crawl_engine import QueueDepths, crawl, crawl_detail_pages
+from extractor import BROWSER_EXTRACT_SCRIPT, DEFAULTS, FULL_TITLE, LIST_STRAINER, make_soup, parse_manga_html, parse_manga_id, parse_ranking_rows, with_defaults
+from frontier import CrawlFrontier
+from page_cache import CachingFetcher, PageCache, is_detail_url
+import metrics
+from rate_limiter import RateLimiter
+from retry import RetryingFetcher
+from scheduler import plan_recrawl, timestamp
+from storage import LEGACY_TITLE, open_store, save_data_to_file, stored_record
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from functools import partial
+import multiprocessing
 import os
-import random
-
-
-def initialize_driver(headless=True):
-    """Initialize the Selenium WebDriver with an option to toggle headless mode."""
+from urllib.parse import urlsplit
+import trio
+
+
+# Elements that must be present before a page's HTML is worth reading
+DETAIL_READY_SELECTOR = 'div.score-label'
+LIST_READY_SELECTOR = 'td.title a.hoverinfo_trigger'
+
+# "Lean" browsing: the extractor only reads the HTML, so Chrome is told not to
+# download anything else. Patterns are for DevTools' Network.setBlockedURLs.
+BLOCKED_URL_PATTERNS = [
+    # Images, media, fonts and stylesheets
+    "*.jpg", "*.jpeg", "*.png", "*.gif", "*.webp", "*.svg", "*.ico",
+    "*.mp4", "*.webm", "*.woff", "*.woff2", "*.ttf", "*.otf", "*.css",
+    # Ad and analytics hosts
+    "*doubleclick.net*", "*googlesyndication.com*", "*googletagmanager.com*",
+    "*google-analytics.com*", "*googletagservices.com*", "*adservice.google.*",
+    "*amazon-adsystem.com*", "*scorecardresearch.com*", "*quantserve.com*",
+    "*criteo.com*", "*pubmatic.com*", "*rubiconproject.com*", "*adnxs.com*",
+    "*taboola.com*", "*outbrain.com*", "*facebook.net*", "*twitter.com/widgets*",
+]
+LEAN_CHROME_ARGUMENTS = [
+    "--blink-settings=imagesEnabled=false",
+    "--disable-extensions",
+    "--disable-gpu",
+    "--disable-dev-shm-usage",
+    "--disable-background-networking",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--mute-audio",
+    "--no-first-run",
+    "--disk-cache-size=1",
+    "--js-flags=--max-old-space-size=256",
+]
+LEAN_CHROME_PREFS = {
+    "profile.managed_default_content_settings.images": 2,
+    "profile.managed_default_content_settings.plugins": 2,
+    "profile.managed_default_content_settings.popups": 2,
+    "profile.managed_default_content_settings.notifications": 2,
+}
+
+
+def initialize_driver(headless=True, page_load_strategy="eager", lean=True, performance_log=False):
+    """Initialize the Selenium WebDriver with an option to toggle headless mode.
+
+    The default "eager" strategy returns from driver.get once the DOM is parsed,
+    without waiting for images and third-party scripts; callers then wait for
+    the specific elements they need (see SeleniumFetcher.get's ready_selector).
+    With lean=True images, media, fonts, stylesheets and ad/analytics hosts are
+    never downloaded (content settings plus DevTools URL blocking), and Chrome
+    runs with memory-saving flags. With performance_log=True DevTools events
+    are recorded for driver.get_log('performance') (used by benchmarks).
+    """
     options = Options()
+    options.page_load_strategy = page_load_strategy
+    if performance_log:
+        options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
     
     if headless:
         options.add_argument("--headless")  # Enable headless mode
+    if lean:
+        for argument in LEAN_CHROME_ARGUMENTS:
+            options.add_argument(argument)
+        options.add_experimental_option("prefs", LEAN_CHROME_PREFS)
     
     options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36")
     service = Service(executable_path="chromedriver.exe")
-    return webdriver.Chrome(service=service, options=options)
-
-
-def load_existing_data(file_path):
-    """Load existing manga data from JSON file or initialize empty list."""
-    if os.path.exists(file_path):
-        with open(file_path, mode='r', encoding='utf-8') as file:
-            try:
-                return json.load(file)  # Load existing data
-            except json.JSONDecodeError:
-                return []  # If file is empty or invalid, return empty list
-    return []
-
-
-def save_data_to_file(data, file_path):
-    """Save manga data to JSON file."""
-    with open(file_path, mode='w', encoding='utf-8') as file:
-        json.dump(data, file, ensure_ascii=False, indent=4)
-        print(f"Data saved to {file_path}")
+    driver = webdriver.Chrome(service=service, options=options)
+    if lean:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URL_PATTERNS})
+    return driver
+
+
+def initialize_fetcher(backend="selenium", headless=True, rate_limiter=None, page_load_strategy="eager", cache_dir=None, pool_size=4, lean=True, retries=True, refresh_cache=False):
+    """Create the page fetcher for a run.
+
+    backend="selenium" drives Chrome; backend="http" uses pooled keep-alive GETs,
+    which is enough for every field we extract since MAL renders them server-side.
+    backend="selenium-pool" drives up to pool_size Chrome sessions from a
+    DriverPool, for concurrent crawls of pages that really need a browser.
+    Every page load waits on rate_limiter (a fresh per-host RateLimiter by default).
+    lean=False gives Chrome its normal profile (see initialize_driver).
+    With cache_dir, raw HTML is kept in a PageCache and reused before any fetch
+    (or, with refresh_cache, only updated).
+    With retries, transient errors are retried with backoff and a circuit
+    breaker pauses the crawl when most requests fail (see retry.RetryingFetcher).
+    """
+    rate_limiter = rate_limiter or RateLimiter()
+    if backend == "selenium":
+        fetcher = SeleniumFetcher(initialize_driver(headless, page_load_strategy, lean), rate_limiter)
+    elif backend == "selenium-pool":
+        pool = DriverPool(partial(initialize_driver, headless, page_load_strategy, lean), size=pool_size)
+        fetcher = PooledFetcher(pool, rate_limiter)
+    elif backend == "http":
+        fetcher = HttpFetcher(rate_limiter=rate_limiter)
+    else:
+        raise ValueError(f"Unknown fetcher backend: {backend}")
+    if retries:
+        fetcher = RetryingFetcher(fetcher)
+    return CachingFetcher(fetcher, PageCache(cache_dir), refresh=refresh_cache) if cache_dir else fetcher
+
+
+def parse_top_manga_links(html):
+    """Return every manga detail link on a topmanga.php page."""
+    # Parse only the ranking title cells
+    soup = make_soup(html, LIST_STRAINER)
+    return [tag['href'] for tag in soup.select('td.title a.hoverinfo_trigger.fl-l.ml12.mr8')]
 
 
 def scrape_top_manga_links(driver, num_links):
     """Scrape top manga links from the current page."""
-    time.sleep(random.uniform(5, 15))  # Random delay
-
-    # Parse the HTML
-    soup = BeautifulSoup(driver.page_source, 'html.parser')
-
     # Find all manga links
-    manga_links = [tag['href'] for tag in soup.select('td.title a.hoverinfo_trigger.fl-l.ml12.mr8')]
+    manga_links = parse_top_manga_links(driver.page_source)
     
     # Debug print: show extracted links
     print(f"Extracted {len(manga_links)} manga links")
@@ -59,159 +140,456 @@ def scrape_top_manga_links(driver, num_links):
     return manga_links[:num_links]
 
 
-def click_next_page(driver):
-    """Click the 'Next 50' link to navigate to the next page of manga."""
-    try:
-        next_button = driver.find_element("css selector", 'a.link-blue-box.next')
-        next_button.click()
-        time.sleep(random.uniform(5, 15))  # Random delay for page load
-        return True
-    except Exception as e:
-        print(f"Error clicking next page: {e}")
-        return False
+def extract_manga_data(driver, url, in_browser=False):
+    """Load a manga detail page and extract its data.
 
+    With in_browser=True (Selenium backends only) the fields are extracted by
+    a script inside the page, so the HTML never crosses the WebDriver wire
+    and is not parsed in Python.
+    """
+    if in_browser:
+        return manga_record(driver.evaluate(url, BROWSER_EXTRACT_SCRIPT, DETAIL_READY_SELECTOR), url)
+    driver.get(url, DETAIL_READY_SELECTOR)  # Waits for the rate limiter, then for the page to be ready
+    return parse_manga_page(driver.page_source, url, page_fetched_at(driver, url))
 
-def extract_manga_data(driver, url):
-    driver.get(url)
-    time.sleep(random.uniform(5, 15))
-    soup = BeautifulSoup(driver.page_source, 'html.parser')
-
-    def safe_text(selector, default="N/A"):
-        el = soup.select_one(selector)
-        return el.text.strip() if el else default
-
-    def safe_attr(selector, attr, default="N/A"):
-        el = soup.select_one(selector)
-        return el.get(attr) or default if el else default
-
-    # NEW: directly extract Themes
-    def extract_themes():
-        label = soup.find('span', class_='dark_text', string='Themes:')
-        if not label:
-            return []
-        # parent of label contains all the <a> tags for each theme
-        container = label.parent
-        return [a.text.strip() for a in container.find_all('a')]
-
-    manga_data = {
-        "Title": safe_text('span.h1-title span[itemprop="name"]', "Unknown Title"),
-        "Type": safe_text('div.spaceit_pad:has(span.dark_text:-soup-contains("Type")) a', "Unknown"),
-        "Score": safe_text('div.score-label', "N/A"),
-        "Rank": safe_text('span.ranked strong', "N/A"),
-        "Popularity": safe_text('span.popularity strong', "N/A"),
-        "Members": safe_text('span.members strong', "N/A"),
-        "Favourites": safe_text('span:contains("Favorites:")', "N/A"),
-        "Authors": [a.text for a in soup.select('span.author a')],
-        "Synopsis": safe_text('span[itemprop="description"]', "N/A"),
-        "Genres": [g.text.strip() for g in soup.select('div.spaceit_pad span.dark_text:contains("Genres") ~ a')],
-        "Themes": extract_themes(),
-        "Demographic": safe_text('div.spaceit_pad:has(span:-soup-contains("Demographic")) a', "Unknown"),
-        "Recommended": safe_text('div.recommended strong', "N/A"),
-        "Mixed Feelings": safe_text('div.mixed-feelings strong', "N/A"),
-        "Not Recommended": safe_text('div.not-recommended strong', "N/A"),
-
-        # Bagian yang diubah: mengambil URL gambar dari data-src, fallback ke src
-        "Image URL": safe_attr(
-            'img[itemprop="image"]', 'data-src',
-            safe_attr('img[itemprop="image"]', 'src', "N/A")
-        )
-    }
 
-    return manga_data
+def page_fetched_at(driver, url):
+    """When url was really fetched, if driver keeps a page cache; None means now.
 
+    A page served from the cache can be days old, and its record must say so
+    or the recrawl scheduler would take it for fresh.
+    """
+    if not isinstance(driver, CachingFetcher):
+        return None
+    fetched_at = driver.cache.fetched_at(url)
+    return datetime.fromtimestamp(fetched_at, timezone.utc) if fetched_at else None
 
 
-def collect_manga_data(manga_links, data, driver, file_path):
-    """Collect manga data for each link and save it to a file."""
-    number_processed = 0
+def fetch_dated_page(driver, url):
+    """Fetch stage for cached fetchers: the HTML along with when it was fetched."""
+    return driver.fetch(url, DETAIL_READY_SELECTOR), page_fetched_at(driver, url)
 
-    for url in manga_links:
-        print(f"Processing: {url}")
-        manga_data = extract_manga_data(driver, url)
 
-        # Check if title already exists
-        if any(manga['Title'] == manga_data['Title'] for manga in data):
-            print(f"{manga_data['Title']} already exists")
-        else:
-            data.append(manga_data)
-            number_processed += 1
-            print(f"Added {number_processed}. {manga_data['Title']}")
-            save_data_to_file(data, file_path)  # Save data after each addition
+def parse_dated_page(page, url):
+    """Parse stage matching fetch_dated_page."""
+    html, fetched_at = page
+    return parse_manga_page(html, url, fetched_at)
 
 
-def click_next_page(driver):
-    """Click the 'Next 50' link to navigate to the next page of manga."""
-    try:
-        # Wait for the 'Next 50' button to be visible and clickable
-        wait = WebDriverWait(driver, 10)  # Wait up to 10 seconds
-        next_button = wait.until(
-            EC.element_to_be_clickable((By.CSS_SELECTOR, 'a.link-blue-box.next'))
-        )
-        next_button.click()  # Click the 'Next 50' button
-        time.sleep(random.uniform(5, 15))  # Random delay for page load
-        return True
-    except Exception as e:
-        print(f"Error clicking next page: {e}")
-        return False
+def manga_record(fields, url=None, fetched_at=None):
+    """Build a stored record from extracted fields.
+
+    "Last Fetched" records when the page was fetched (now, unless fetched_at
+    says otherwise), which the recrawl scheduler uses to judge staleness.
+    The full header text rides along as storage.LEGACY_TITLE when it differs
+    from the Title, so id-less records older versions saved under it are
+    still found; the stores never save it.
+    """
+    manga_data = {"MAL ID": parse_manga_id(url) if url else None}
+    fields = with_defaults(fields)
+    full_title = fields.pop(FULL_TITLE, None)
+    manga_data.update(fields)
+    manga_data["Last Fetched"] = timestamp(fetched_at)
+    if full_title and full_title != manga_data["Title"]:
+        manga_data[LEGACY_TITLE] = full_title
+    return manga_data
 
 
-def main(num_iterations=10, headless=True):
-    """Main function to scrape manga data with URL limit increment."""
-    file_path = 'manga_data_new.json'
-    base_url = "https://myanimelist.net/topmanga.php?limit="  # Base URL with limit parameter
+def parse_manga_page(html, url=None, fetched_at=None):
+    """Extract the manga fields from the HTML of a detail page."""
+    return manga_record(parse_manga_html(html), url, fetched_at)
 
-    # Initialize driver with headless mode control
-    driver = initialize_driver(headless)
-    data = load_existing_data(file_path)
 
-    try:
-        for i in range(num_iterations):
-            # Construct URL for the current iteration (increasing limit by 50 each time)
-            current_limit = i * 50
-            current_url = base_url + str(current_limit)
-            print(f"Processing page with limit {current_limit}: {current_url}")
+def detail_stages(driver, in_browser=False):
+    """The (fetch, parse) pair the crawl engine uses for detail pages.
 
-            # Load the current page
-            driver.get(current_url)
-            time.sleep(random.uniform(5, 15))  # Random delay for page load
+    With in_browser=True "fetching" already returns the extracted fields, and
+    parsing only turns them into a record.
+    """
+    if in_browser:
+        return partial(driver.evaluate, script=BROWSER_EXTRACT_SCRIPT, ready_selector=DETAIL_READY_SELECTOR), manga_record
+    if isinstance(driver, CachingFetcher):
+        return partial(fetch_dated_page, driver), parse_dated_page
+    return partial(driver.fetch, ready_selector=DETAIL_READY_SELECTOR), parse_manga_page
 
-            # Scrape manga links (you can set how many you want to collect here)
-            manga_links = scrape_top_manga_links(driver, num_links=50)
 
-            # Collect data for each manga link and save it
-            collect_manga_data(manga_links, data, driver, file_path)
+def add_manga_data(manga_data, store):
+    """Add manga_data to the store, unless it already exists. Returns True if added."""
+    # O(1) check against the store's index (MAL id, or title for records saved without one)
+    with metrics.timer('dedup'):
+        exists = manga_data in store
+    if exists:
+        mal_id = manga_data.get('MAL ID')
+        if mal_id is not None and not store.has_id(mal_id):
+            store.add(manga_data)  # Saved before ids were recorded; fill in its id
+            print(f"{manga_data['Title']} already exists, recorded its MAL id {mal_id}")
+        else:
+            print(f"{manga_data['Title']} already exists")
+        return False
+    store.add(manga_data)  # Persist each addition as it happens
+    return True
+
+
+def add_manga_batch(results, store):
+    """Batch form of add_manga_data for the crawl engine's writer: one store write per batch."""
+    to_store = []
+    for url, manga_data in results:
+        with metrics.timer('dedup'):
+            exists = manga_data in store
+        if not exists:
+            to_store.append(manga_data)
+            print(f"Added {manga_data['Title']}")
+        elif manga_data.get('MAL ID') is not None and not store.has_id(manga_data['MAL ID']):
+            to_store.append(manga_data)  # Saved before ids were recorded; fill in its id
+            print(f"{manga_data['Title']} already exists, recorded its MAL id {manga_data['MAL ID']}")
+        else:
+            print(f"{manga_data['Title']} already exists")
+    store.add_many(to_store)
+
+
+def store_batch(results, store):
+    """Crawl engine writer that adds or replaces every record of a batch."""
+    store.add_many([manga_data for url, manga_data in results])
+
+
+def run_pipeline(engine, *args, **options):
+    """Run a crawl engine coroutine with detail pages parsed on every core.
+
+    Parsing happens in a process pool, so the fetch, parse and write stages
+    all progress at once; queue depths are printed at the end to show which
+    stage held the crawl back.
+    """
+    queue_depths = QueueDepths()
+    workers = os.cpu_count() or 1
+    # Never fork: the store and metrics threads are running, and a child forked
+    # while one of them holds a lock (e.g. METRICS.lock) would deadlock on it
+    start_method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context(start_method)) as parse_pool:
+        trio.run(partial(engine, *args, parse_pool=parse_pool, parse_workers=workers,
+                         queue_depths=queue_depths, **options))
+    print(queue_depths.summary())
+
+
+def drop_known_links(manga_links, store, frontier=None):
+    """Return the links whose MAL id is not in the store yet, before paying for any fetch."""
+    new_links = []
+    with metrics.timer('dedup'):
+        known = [store.has_id(parse_manga_id(url)) for url in manga_links]
+    for url, is_known in zip(manga_links, known):
+        if not is_known:
+            new_links.append(url)
+        elif frontier:
+            frontier.complete(url)
+    skipped = len(manga_links) - len(new_links)
+    if skipped:
+        print(f"Skipping {skipped} already known manga")
+    return new_links
+
+
+def collect_manga_data(manga_links, store, driver, frontier=None, in_browser=False):
+    """Collect manga data for each link and add it to the store.
+
+    With a frontier, attempts and completions are checkpointed; a page that
+    fails stays pending in the frontier to be retried.
+    """
+    number_processed = 0
+    manga_links = drop_known_links(manga_links, store, frontier)
 
-            print(f"Finished processing page with limit {current_limit}")
+    for url in manga_links:
+        if frontier and not frontier.begin(url):
+            continue
+        print(f"Processing: {url}")
+        try:
+            manga_data = extract_manga_data(driver, url, in_browser)
+        except Exception as e:
+            print(f"Error processing {url}: {e}")
+            continue
 
-    finally:
-        driver.quit()  # Make sure to quit the driver after processing
-    # Define constants
-    file_path = 'manga_data.json'
-    top_manga_url = "https://myanimelist.net/topmanga.php?limit=150"
+        if add_manga_data(manga_data, store):
+            number_processed += 1
+            print(f"Added {number_processed}. {manga_data['Title']}")
+        if frontier:
+            frontier.complete(url)
+
+
+def collect_manga_data_concurrently(manga_links, store, driver, concurrency=4, frontier=None, in_browser=False):
+    """Like collect_manga_data, but fetch up to `concurrency` pages at once with the trio engine.
+
+    All workers share the fetcher's per-host rate limiter, so the politeness
+    budget is global rather than per request. The fetcher's fetch() must be
+    thread-safe (the HTTP backend is).
+    """
+    manga_links = drop_known_links(manga_links, store, frontier)
+
+    def on_result(url, manga_data):
+        print(f"Processed: {url}")
+        if frontier:
+            frontier.complete(url)  # Only once the writer has stored it
+
+    run_pipeline(
+        crawl_detail_pages, manga_links, *detail_stages(driver, in_browser), on_result,
+        max_in_flight=concurrency, write=partial(add_manga_batch, store=store),
+        before_fetch=frontier.begin if frontier else None,
+    )
+
+
+def crawl_concurrently(frontier, store, driver, concurrency=4, in_browser=False):
+    """Work through the frontier with the trio engine: list and detail pages in parallel.
+
+    Every pending list page is fetched concurrently under the shared rate
+    limiter and its new links are queued for the detail workers as soon as it
+    lands. Failed pages stay pending in the frontier.
+    """
+    def on_links(list_url, manga_links):
+        print(f"Extracted {len(manga_links)} manga links from {list_url}")
+        new_links = frontier.add_details(drop_known_links(manga_links, store))
+        frontier.list_page_done(list_url)
+        return new_links
+
+    def on_result(url, manga_data):
+        print(f"Processed: {url}")
+        frontier.complete(url)  # Only once the writer has stored it
+
+    # Attempts are counted by the workers as each URL is taken off its queue
+    leftover_links = drop_known_links(list(frontier.pending_details), store, frontier)
+    run_pipeline(
+        crawl, list(frontier.pending_list_pages), partial(driver.fetch, ready_selector=LIST_READY_SELECTOR),
+        parse_top_manga_links, on_links, leftover_links,
+        *detail_stages(driver, in_browser), on_result,
+        max_in_flight=concurrency, write=partial(add_manga_batch, store=store), before_fetch=frontier.begin,
+    )
+
+
+# Stats shown on topmanga.php rows, and every field a current record has
+LIST_STATS_FIELDS = ("Rank", "Score", "Members")
+RECORD_FIELDS = ("MAL ID", *DEFAULTS, "Last Fetched")
+
+
+def is_incomplete(manga_data):
+    """True if a stored record lacks a field the current extractor always writes.
+
+    Only records from an older scraper version qualify. A placeholder such as
+    Synopsis "N/A" or empty Genres is what the page really shows, and
+    re-fetching it on every refresh would not change it.
+    """
+    return any(field not in manga_data for field in RECORD_FIELDS)
+
+
+def apply_list_stats(rows, store):
+    """Update stored records in place from topmanga.php rows.
+
+    Returns the detail URLs that still need a full page load: ids not in the
+    store yet and records written by an older scraper version.
+    """
+    updated, needs_detail = [], []
+    for row in rows:
+        manga_data = store.get_by_id(row['MAL ID'])
+        if manga_data is None or is_incomplete(manga_data):
+            needs_detail.append(row['URL'])
+            continue
+        fresh = dict(manga_data, **{field: row[field] for field in LIST_STATS_FIELDS})
+        if fresh != manga_data:
+            updated.append(fresh)
+    store.add_many(updated)  # One write for the whole list page
+    print(f"Refreshed {len(updated)} of {len(rows)} manga, {len(needs_detail)} need their detail page")
+    return needs_detail
+
+
+def refresh_stats(list_urls, store, driver, concurrency=1, in_browser=False):
+    """Refresh Rank/Score/Members from list pages alone.
+
+    Detail pages are only loaded for new ids or records from an older
+    scraper version (see is_incomplete), so refreshing the top 10,000 costs ~200 list page loads.
+    """
+    def on_result(url, manga_data):
+        store.add(manga_data)  # Adds a new manga or replaces an incomplete one
+        print(f"Fetched details of {manga_data['Title']}")
+
+    if concurrency > 1:
+        run_pipeline(
+            crawl, list_urls, partial(driver.fetch, ready_selector=LIST_READY_SELECTOR),
+            parse_ranking_rows, lambda list_url, rows: apply_list_stats(rows, store), (),
+            *detail_stages(driver, in_browser),
+            lambda url, manga_data: print(f"Fetched details of {manga_data['Title']}"),
+            max_in_flight=concurrency, write=partial(store_batch, store=store),
+        )
+        return
 
-    # Initialize driver with headless mode control
-    driver = initialize_driver(headless)
-    data = load_existing_data(file_path)
+    for list_url in list_urls:
+        print(f"Refreshing stats from: {list_url}")
+        driver.get(list_url, LIST_READY_SELECTOR)
+        for url in apply_list_stats(parse_ranking_rows(driver.page_source), store):
+            try:
+                on_result(url, extract_manga_data(driver, url, in_browser))
+            except Exception as e:
+                print(f"Error processing {url}: {e}")
 
-    # Load the first page
-    driver.get(top_manga_url)
 
-    try:
-        for _ in range(num_iterations):
-            # Scrape manga links (you can set how many you want to collect here)
-            manga_links = scrape_top_manga_links(driver, num_links=50)
+def recrawl_stale(store, driver, budget, site_url, concurrency=1, in_browser=False):
+    """Re-fetch the `budget` detail pages most worth refreshing (see scheduler.plan_recrawl).
 
-            # Collect data for each manga link and save it
-            collect_manga_data(manga_links, data, driver, file_path)
+    Priority combines how long ago a record was fetched with how popular the
+    manga is, so a fixed crawl budget goes where the data changes most.
+    """
+    urls = [f"{site_url}/manga/{manga['MAL ID']}" for manga in plan_recrawl(store.records, budget)]
+    print(f"Re-crawling {len(urls)} stale manga")
+
+    def on_result(url, manga_data):
+        store.add(manga_data)  # Replaces the stale version
+        print(f"Refreshed {manga_data['Title']}")
+
+    if concurrency > 1:
+        run_pipeline(
+            crawl_detail_pages, urls, *detail_stages(driver, in_browser),
+            lambda url, manga_data: print(f"Refreshed {manga_data['Title']}"),
+            max_in_flight=concurrency, write=partial(store_batch, store=store),
+        )
+        return
+    for url in urls:
+        try:
+            on_result(url, extract_manga_data(driver, url, in_browser))
+        except Exception as e:
+            print(f"Error processing {url}: {e}")
+
+
+def reparse_from_cache(cache_dir, file_path='manga_data_new.json'):
+    """Rebuild the dataset offline from every detail page in the page cache.
+
+    Ignores the cache TTL and never touches the network, so selector fixes can
+    be applied to the whole crawl in seconds.
+    """
+    cache = PageCache(cache_dir)
+    data = []
+    seen = set()
+    for url in cache.urls():
+        if not is_detail_url(url):
+            continue
+        fetched_at = datetime.fromtimestamp(cache.fetched_at(url), timezone.utc)
+        manga_data = parse_manga_page(cache.read(url), url, fetched_at)
+        if manga_data['MAL ID'] not in seen:
+            seen.add(manga_data['MAL ID'])
+            data.append(stored_record(manga_data))
+    save_data_to_file(data, file_path)
+    print(f"Reparsed {len(data)} manga from {cache_dir}")
+    return data
+
+
+def report_metrics(metrics_path=None):
+    """Print the end-of-run metrics summary and write the final metrics file."""
+    metrics.METRICS.stop(metrics_path)
+    print(metrics.METRICS.summary())
+
+
+def main(num_iterations=10, headless=True, backend="selenium", base_url="https://myanimelist.net/topmanga.php?limit=", concurrency=1, cache_dir=None, storage="json", frontier_path='crawl_frontier.json', mode="crawl", recrawl_budget=100, extraction="html", metrics_path=None, metrics_interval=30, rate_limiter=None):
+    """Main function to scrape manga data with URL limit increment.
+
+    With concurrency > 1 all list pages and their detail pages are fetched in
+    parallel by the trio engine, which needs a thread-safe backend ("http",
+    or "selenium-pool" with one Chrome session per concurrent page),
+    while detail pages are parsed in a process pool and written in batches.
+    With cache_dir, raw list and detail pages are cached on disk (see
+    reparse_from_cache to rebuild the dataset from them). storage="jsonl"
+    appends each record to manga_data_new.jsonl instead of rewriting the JSON
+    file, and exports the JSON file when the run ends; storage="sqlite"
+    keeps the records in the indexed manga_data_new.sqlite3 database instead.
+
+    Progress is checkpointed to frontier_path; if a previous run did not
+    finish, it is resumed (its plan wins over num_iterations/base_url).
+
+    mode="stats" only refreshes Rank/Score/Members of known manga from the
+    list pages (see refresh_stats) and skips the frontier. mode="recrawl"
+    re-fetches the recrawl_budget stalest, most popular known manga (see
+    recrawl_stale), e.g. from an hourly job.
+
+    extraction="browser" (Selenium backends) extracts detail page fields with
+    a script inside the page instead of transferring and parsing page_source.
+
+    Stage timings and pages/minute are printed when the run ends; with
+    metrics_path they are also written there as JSON every metrics_interval
+    seconds. rate_limiter overrides the default request budget (see
+    initialize_fetcher).
+    """
+    file_path = 'manga_data_new.json'
+    if concurrency > 1 and backend not in ("http", "selenium-pool"):
+        raise ValueError("Concurrent crawling requires backend='http' or backend='selenium-pool'")
+    if extraction not in ("html", "browser"):
+        raise ValueError(f"Unknown extraction mode: {extraction}")
+    in_browser = extraction == "browser"
+    if in_browser and backend == "http":
+        raise ValueError("In-browser extraction requires a Selenium backend")
+
+    # Open the dataset first: a corrupt file should stop the run before Chrome starts
+    store = open_store(file_path, storage)
+    # Initialize the fetcher (Chrome or plain HTTP) with headless mode control
+    # Stats refreshes and re-crawls exist to get fresh data, so they never read the cache
+    driver = initialize_fetcher(backend, headless, rate_limiter, cache_dir=cache_dir, pool_size=concurrency,
+                                refresh_cache=mode != "crawl")
+    if metrics_path:
+        metrics.METRICS.write_periodically(metrics_path, metrics_interval)
+    # Construct URLs for every iteration (increasing limit by 50 each time)
+    list_urls = [base_url + str(i * 50) for i in range(num_iterations)]
+    site = urlsplit(base_url)
+    site_url = f"{site.scheme}://{site.netloc}"
+    if mode in ("stats", "recrawl"):
+        try:
+            if mode == "stats":
+                refresh_stats(list_urls, store, driver, concurrency, in_browser)
+            else:
+                recrawl_stale(store, driver, recrawl_budget, site_url, concurrency, in_browser)
+        finally:
+            driver.quit()
+            store.close()
+            report_metrics(metrics_path)
+        return
+
+    frontier = CrawlFrontier(frontier_path)
+    if frontier.is_finished():
+        frontier.plan(list_urls)
+    else:
+        print(f"Resuming crawl: {len(frontier.pending_list_pages)} list pages and "
+              f"{len(frontier.pending_details)} manga pages left")
+    requeued = frontier.requeue_missing(store, site_url)
+    if requeued:
+        print(f"Re-fetching {requeued} manga whose records were lost before being saved")
+
+    try:
+        while not frontier.is_finished():
+            if concurrency > 1:
+                crawl_concurrently(frontier, store, driver, concurrency, in_browser)
+                continue  # Anything that failed is still pending and gets retried
+
+            if not frontier.pending_details:
+                current_url = frontier.pending_list_pages[0]
+                if not frontier.begin(current_url):
+                    continue  # Given up on; it is no longer pending
+                print(f"Processing page: {current_url}")
+
+                try:
+                    # Load the current page (rate limited by the fetcher) and wait for the ranking rows
+                    driver.get(current_url, LIST_READY_SELECTOR)
+
+                    # Scrape manga links (you can set how many you want to collect here)
+                    manga_links = scrape_top_manga_links(driver, num_links=50)
+                except Exception as e:
+                    print(f"Error processing {current_url}: {e}")
+                    continue  # Still pending; retried until its attempts run out
+                frontier.add_details(drop_known_links(manga_links, store))
+                frontier.list_page_done(current_url)
+
+            # Collect data for each pending manga link and save it
+            collect_manga_data(list(frontier.pending_details), store, driver, frontier, in_browser)
+
+            if frontier.pending_details:
+                print(f"{len(frontier.pending_details)} manga pages left to retry")
+            else:
+                print(f"Finished list page, {len(frontier.pending_list_pages)} left")
 
-            # Click the next page if available
-            if not click_next_page(driver):
-                print("No more pages to scrape.")
-                break
     finally:
         driver.quit()  # Make sure to quit the driver after processing
+        store.close()
+        report_metrics(metrics_path)
 
 
 # Example usage
 if __name__ == "__main__":
-    main(num_iterations=5, headless=False)  # You can set headless=False to disable headless mode
\ No newline at end of file
+    main(num_iterations=5, headless=False)  # You can set headless=False to disable headless mode, or backend="http" to skip Chrome
\ No newline at end of file